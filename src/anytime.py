@@ -0,0 +1,57 @@
+import math
+
+import consts as c
+import state as st
+import heuristic
+
+from astar import astar
+from board import Board
+from openlist import HeapOpenList
+
+# Anytime search: weighted A* passes with decreasing weights. Each pass only
+# looks for paths shorter than the best one found so far, which is published
+# through stats.report_solution as soon as it is known. A pass with weight w
+# that finds a path proves it at most w times longer than optimal, and a pass
+# that finds nothing proves the best path optimal. When the stop event fires,
+# the best path so far is returned instead of nothing.
+#
+# Weighted passes search with a heap whatever open_list_type is: their f values
+# are not integers. Only the last pass, with weight 1, uses open_list_type.
+
+def anytime(board : Board, h_score, stop_event=None, open_list_type=HeapOpenList, stats=None, weights : list = c.ANYTIME_WEIGHTS) -> list[int]:
+    best : list = []
+    suboptimality : float = math.inf
+
+    # Proven lower bound on the optimal length, kept in stats.f_bound during the
+    # whole search: weighted passes leave f_bound alone (see astar)
+    lower : int = heuristic.get_estimator(h_score, board)(st.read_board(board))
+
+    for weight in weights:
+        if stats is not None:
+            stats.f_bound = max(stats.f_bound, lower)
+
+        cost_limit = len(best) - 1 if best else math.inf
+        path : list = astar(board, h_score, stop_event, open_list_type, stats, weight=weight, cost_limit=cost_limit)
+
+        if path:
+            best, suboptimality = path, weight
+        elif stop_event and stop_event.is_set():
+            break
+        elif not best:
+            break  # No path at all
+        else:
+            suboptimality = 1.0  # Nothing shorter than the best path
+
+        if best:
+            lower = max(lower, math.ceil((len(best) - 1) / suboptimality))
+
+            if stats is not None:
+                stats.report_solution(best, suboptimality)
+
+        if suboptimality == 1.0:
+            break
+
+    if stats is not None:
+        stats.f_bound = max(stats.f_bound, lower)
+
+    return best
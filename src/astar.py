@@ -1,34 +1,18 @@
 import math
-import heapq
 
 import consts as c
+import state as st
+import moves
+import heuristic
 
 from board import Board
+from openlist import HeapOpenList
 
-def get_neighbors(board : Board, state : tuple) -> list[tuple]:
-    neighbors : list = []
+def get_neighbors(board : Board, state : int) -> list[int]:
+    # Moves are computed from the precomputed wall stops, the board is left untouched
+    return moves.get_neighbors(board.get_stop_table(), state)
 
-    # For each pawn, try each possible move
-    for pawn_id in range(1, c.PAWN_NUMBER + 1):
-        for direction in [c.MOVE_UP, c.MOVE_DOWN, c.MOVE_LEFT, c.MOVE_RIGHT]:
-            board.clear_pawns()
-
-            # Set pawns positions according to the current state
-            for i in range(c.PAWN_NUMBER):
-                x, y = state[i]
-                board.set_cell_value(x, y, i + 1)
-
-            if board.move_pawn(pawn_id, direction):
-                # If move is successful, record new state
-                new_pawns : list = []
-                for i in range(c.PAWN_NUMBER):
-                    new_pawns.append(board.get_pawn(i + 1))
-
-                neighbors.append(tuple(new_pawns))
-
-    return neighbors
-
-def reconstruct_path(closed : dict, current : tuple) -> list[tuple]:
+def reconstruct_path(closed : dict, current : int) -> list[int]:
     total_path = [current]
 
     while current in closed:
@@ -40,21 +24,59 @@ def reconstruct_path(closed : dict, current : tuple) -> list[tuple]:
 
     return total_path
 
-def astar(board : Board, h_score : dict, stop_event=None) -> list[tuple]:
-    goal_pos : tuple[int, int] = board.get_goal()
+def canonical_neighbors(get_neighbors, goal_index : int):
+    def neighbors(stops : dict, state : int) -> list[int]:
+        return [st.canonical_state(ns, goal_index) for ns in get_neighbors(stops, state)]
+
+    return neighbors
+
+def unfold_path(stops : dict, path : list, start : int, goal_index : int) -> list[int]:
+    # Replay a path of canonical states (dest to src) from the real initial
+    # state, picking at each step the real move reaching the next canonical state
+    real_path : list = [start]
+
+    for target in reversed(path[:-1]):
+        for ns in moves.get_neighbors(stops, real_path[-1]):
+            if st.canonical_state(ns, goal_index) == target:
+                real_path.append(ns)
+                break
+
+    return real_path[::-1]
+
+def astar(board : Board, h_score, stop_event=None, open_list_type=HeapOpenList, stats=None, canonical : bool = False, weight : float = 1, cost_limit = math.inf) -> list[int]:
+    # weight > 1 inflates the heuristic (weighted A*): paths are found faster but
+    # may be up to weight times longer than optimal. States that cannot lead to a
+    # path shorter than cost_limit are skipped, assuming h_score never overestimates.
+    # Weighted f values are not integers: they go to a heap whatever open_list_type
+    # says, rounding them would lose the bound on the path length.
+    weighted : bool = weight != 1
+    goal_cell : int = st.encode_pos(board.get_goal())
     goal_id : int = board.get_goal_color()
     goal_index : int = goal_id - 1
+    goal_shift : int = goal_index * c.PAWN_BITS
 
-    # Initial state: positions of all pawns (node is a tuple of pawn coords)
-    pawns : list = []
-    for i in range(c.PAWN_NUMBER):
-        pawns.append(board.get_pawn(i + 1))
+    estimate = heuristic.get_estimator(h_score, board)
 
-    state = tuple(pawns)
+    # Initial state: positions of all pawns packed into an integer
+    start : int = st.read_board(board)
+    stops : dict = board.get_stop_table()
 
     # Open list used as a priority queue
-    open_list : list = []
-    heapq.heappush(open_list, (0, state))
+    open_list = HeapOpenList() if weighted else open_list_type()
+    get_neighbors = moves.get_neighbors
+
+    # Search over canonical states, whose other pawns are interchangeable
+    state : int = start
+    if canonical:
+        state = st.canonical_state(start, goal_index)
+        get_neighbors = canonical_neighbors(get_neighbors, goal_index)
+
+    # Statistics are collected by wrapping the hot calls, not inside the loop
+    if stats is not None:
+        open_list = stats.wrap_open_list(open_list, track_bound=weight == 1)
+        get_neighbors = stats.wrap_neighbors(get_neighbors)
+
+    open_list.push(0, state)
 
     # Dictionary of navigated nodes
     closed_set : dict = {}
@@ -64,21 +86,25 @@ def astar(board : Board, h_score : dict, stop_event=None) -> list[tuple]:
     g_score[state] = 0
 
     f_score : dict = {}
-    f_score[state] = h_score.get(state[goal_index], math.inf)
+    f_score[state] = estimate(state)
 
     # While there are still nodes to explore
     while open_list:
         if stop_event and stop_event.is_set():
             return []
         
-        current_state : tuple = heapq.heappop(open_list)[1]
+        current_state : int = open_list.pop()
 
         # Goal is reached when the goal pawn is at the goal position
-        if current_state[goal_index] == goal_pos:
-            board.load_initial_state()
-            return reconstruct_path(closed_set, current_state)
+        if (current_state >> goal_shift) & c.PAWN_MASK == goal_cell:
+            path : list = reconstruct_path(closed_set, current_state)
+
+            if canonical:
+                path = unfold_path(stops, path, start, goal_index)
+
+            return path
         # Get reachable neighbors
-        next_states = get_neighbors(board, current_state)
+        next_states = get_neighbors(stops, current_state)
 
         # Explore each neighbor and find the lowest cost path
         for ns in next_states:
@@ -86,12 +112,15 @@ def astar(board : Board, h_score : dict, stop_event=None) -> list[tuple]:
 
             # If the best path has been found
             if tentative_g_score < g_score.get(ns, math.inf):
+                h = estimate(ns)
+                if tentative_g_score + h >= cost_limit:
+                    continue
+
                 closed_set[ns] = current_state
                 g_score[ns] = tentative_g_score
-                f_score[ns] = tentative_g_score + h_score.get(ns[goal_index], math.inf)
+                f_score[ns] = tentative_g_score + (weight * h if weighted else h)
 
-                # Add neighbor to open list if not already present
-                if ns not in [i[1] for i in open_list]:
-                    heapq.heappush(open_list, (f_score[ns], ns))
+                # Add neighbor to open list, replacing any outdated entry
+                open_list.push(f_score[ns], ns)
 
     return []  # No path found
\ No newline at end of file
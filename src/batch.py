@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import argparse, json, random, sys, time, multiprocessing
+
+import consts as c
+import state as st
+import heuristic
+
+from board import Board
+from cache import Cache, deal_key
+from deadline import Deadline
+from solvers import SOLVERS
+from stats import SearchStats
+
+# Headless solver: generates seeded deals and streams one JSON line per deal
+
+def load_board(filename : str) -> Board:
+    board = Board(c.NB_CELLS)
+    board.create_grid(filename)
+
+    return board
+
+def draw_deal(board : Board) -> tuple:
+    # A deal is a (goal position, packed pawns) pair drawn like a game round.
+    # The board is left with the deal in place.
+    board.clear()
+    board.choose_goal()
+    board.init_pawns()
+
+    return (board.get_goal(), st.read_board(board))
+
+def generate_deals(board : Board, seed : int, count : int) -> list[tuple]:
+    random.seed(seed)
+    deals : list = [draw_deal(board) for _ in range(count)]
+
+    board.clear()
+
+    return deals
+
+def setup_deal(board : Board, goal : tuple[int, int], state : int) -> None:
+    board.clear()
+    board.set_as_goal(goal[0], goal[1])
+    st.write_board(board, state)
+    board.save_initial_state()
+
+def solve_deal(board : Board, goal : tuple[int, int], state : int, solver : str, heuristic_name : str, time_limit : float, cancel_event=None, cache=None) -> dict:
+    setup_deal(board, goal, state)
+
+    stats = SearchStats()
+    start : float = time.perf_counter()
+
+    key : str = deal_key(board, state)
+    path = cache.get(key) if cache is not None else None
+    cached : bool = path is not None
+
+    if not cached:
+        estimator = heuristic.build_estimator(heuristic_name, board)
+        path = SOLVERS[solver](board, estimator, Deadline(time_limit, cancel_event), stats=stats)
+
+        # Paths an anytime solver could not prove optimal are not kept
+        if path and cache is not None and stats.suboptimality in (None, 1.0):
+            cache.put(key, path)
+
+    elapsed : float = time.perf_counter() - start
+
+    result : dict = {
+        "goal": list(goal),
+        "goal_pawn": board.get_goal_color(),
+        "pawns": [list(p) for p in st.decode_state(state)],
+        "moves": len(path) - 1 if path else None,
+        "time": round(elapsed, 6),
+        "cached": cached
+    }
+    result.update(stats.to_dict())
+
+    return result
+
+# Per-process solver context, set once by init_worker
+worker : dict = {}
+
+def init_worker(board_file : str, solver : str, heuristic_name : str, time_limit : float, cancel_event, cache_file : str = None) -> None:
+    # The board is loaded once per process instead of being copied with each deal
+    worker["board"] = load_board(board_file)
+    worker["cache"] = Cache(cache_file) if cache_file else None
+    worker["solver"] = solver
+    worker["heuristic"] = heuristic_name
+    worker["time_limit"] = time_limit
+    worker["cancel_event"] = cancel_event
+
+def solve_task(task : tuple) -> dict:
+    index, goal, state = task
+
+    result : dict = {"deal": index}
+    result.update(solve_deal(worker["board"], goal, state, worker["solver"], worker["heuristic"], worker["time_limit"], worker["cancel_event"], worker["cache"]))
+
+    return result
+
+def solve_all(board_file : str, deals : list, solver : str, heuristic_name : str, time_limit : float, workers : int = 1, chunk_size : int = 1, cancel_event=None, cache_file : str = None):
+    # Yield the result of every deal, in deal order
+    tasks : list = [(i, goal, state) for i, (goal, state) in enumerate(deals)]
+
+    if workers <= 1:
+        init_worker(board_file, solver, heuristic_name, time_limit, cancel_event, cache_file)
+        for task in tasks:
+            yield solve_task(task)
+        return
+
+    if cancel_event is None:
+        cancel_event = multiprocessing.Event()
+
+    with multiprocessing.Pool(workers, init_worker, (board_file, solver, heuristic_name, time_limit, cancel_event, cache_file)) as pool:
+        try:
+            yield from pool.imap(solve_task, tasks, chunk_size)
+        finally:
+            # Running searches stop at their next check, pending ones return at once
+            cancel_event.set()
+
+def parse_args(argv : list):
+    parser = argparse.ArgumentParser(description="Solve seeded deals without the game window.")
+    parser.add_argument("--board", default=c.BOARD_FILE, help="board file")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to draw the deals")
+    parser.add_argument("--deals", type=int, default=100, help="number of deals")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), default="astar")
+    parser.add_argument("--heuristic", choices=heuristic.ESTIMATORS, default=c.HEURISTIC)
+    parser.add_argument("--time-limit", type=float, default=c.DECISION_TIME, help="seconds allowed per deal")
+    parser.add_argument("--workers", type=int, default=1, help="solver processes (0 for one per core)")
+    parser.add_argument("--chunk-size", type=int, default=4, help="deals handed to a worker at once")
+    parser.add_argument("--cache", default=None, help="sqlite file caching solutions across runs")
+
+    return parser.parse_args(argv)
+
+def main(argv : list = None):
+    args = parse_args(argv)
+
+    board : Board = load_board(args.board)
+    deals : list = generate_deals(board, args.seed, args.deals)
+    workers : int = args.workers or multiprocessing.cpu_count()
+
+    for result in solve_all(args.board, deals, args.solver, args.heuristic, args.time_limit, workers, args.chunk_size, cache_file=args.cache):
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+import argparse, json, os, sys, time, tracemalloc
+
+import consts as c
+import heuristic
+
+from batch import load_board, generate_deals, solve_deal
+from solvers import SOLVERS
+
+# Solver benchmark on a fixed corpus of seeded deals, bucketed by optimal length.
+# Results are written as JSON and can be compared against a stored baseline.
+
+BUCKETS : list = [(1, 3), (4, 5), (6, 7), (8, 9), (10, 99)]
+CONFIGS : list = ["astar:helper", "astar:ray", "ida:helper", "bidirectional:helper", "layered:ray"]
+
+# Reference configuration used to find the optimal length of the corpus deals
+REFERENCE : str = "astar:helper"
+
+# Metrics compared against the baseline (higher is worse)
+METRICS : list = ["time", "expanded", "generated", "peak_memory"]
+
+def bucket_name(moves : int) -> str:
+    for low, high in BUCKETS:
+        if low <= moves <= high:
+            return f"{low}-{high}"
+
+    return None
+
+def parse_config(config : str) -> tuple[str, str]:
+    solver, _, heuristic_name = config.partition(":")
+    return solver, heuristic_name or c.HEURISTIC
+
+def build_corpus(board, seed : int, per_bucket : int, time_limit : float, max_deals : int) -> list[dict]:
+    # Draw seeded deals until every bucket is full (or max_deals were drawn)
+    solver, heuristic_name = parse_config(REFERENCE)
+    counts : dict = {f"{low}-{high}": 0 for low, high in BUCKETS}
+    corpus : list = []
+
+    for goal, state in generate_deals(board, seed, max_deals):
+        result : dict = solve_deal(board, goal, state, solver, heuristic_name, time_limit)
+        if result["moves"] is None:
+            continue
+
+        bucket = bucket_name(result["moves"])
+        if bucket is None or counts[bucket] >= per_bucket:
+            continue
+
+        counts[bucket] += 1
+        corpus.append({"goal": list(goal), "state": state, "moves": result["moves"], "bucket": bucket})
+
+        if all(n >= per_bucket for n in counts.values()):
+            break
+
+    return corpus
+
+def measure(board, deal : dict, solver : str, heuristic_name : str, time_limit : float, memory : bool) -> dict:
+    goal : tuple = tuple(deal["goal"])
+
+    # Timed run, without tracing overhead
+    result : dict = solve_deal(board, goal, deal["state"], solver, heuristic_name, time_limit)
+    result["nodes_per_sec"] = result["expanded"] / result["time"] if result["time"] > 0 else 0.0
+
+    # Separate run for the peak memory allocated by the search
+    if memory:
+        tracemalloc.start()
+        solve_deal(board, goal, deal["state"], solver, heuristic_name, time_limit)
+        result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    result["bucket"] = deal["bucket"]
+    result["optimal"] = deal["moves"]
+
+    return result
+
+def summarize(records : list) -> dict:
+    summary : dict = {
+        "deals": len(records),
+        "solved": sum(1 for r in records if r["moves"] is not None),
+        "suboptimal": sum(1 for r in records if r["moves"] is not None and r["moves"] > r["optimal"])
+    }
+
+    for metric in ["time", "expanded", "generated"]:
+        summary[metric] = sum(r[metric] for r in records)
+
+    summary["nodes_per_sec"] = summary["expanded"] / summary["time"] if summary["time"] > 0 else 0.0
+
+    if records and "peak_memory" in records[0]:
+        summary["peak_memory"] = max(r["peak_memory"] for r in records)
+
+    return summary
+
+def run(board, corpus : list, configs : list, time_limit : float, memory : bool) -> dict:
+    results : dict = {}
+
+    for config in configs:
+        solver, heuristic_name = parse_config(config)
+        records : list = [measure(board, deal, solver, heuristic_name, time_limit, memory) for deal in corpus]
+
+        buckets : dict = {}
+        for low, high in BUCKETS:
+            name : str = f"{low}-{high}"
+            selected : list = [r for r in records if r["bucket"] == name]
+
+            if selected:
+                buckets[name] = summarize(selected)
+
+        results[config] = {"total": summarize(records), "buckets": buckets}
+
+    return results
+
+def compare(results : dict, baseline : dict, tolerance : float, min_time : float) -> list[str]:
+    # A metric regresses when it grows by more than the tolerance. Times
+    # shorter than min_time are too noisy to compare.
+    regressions : list = []
+
+    for config, current in results.items():
+        if config not in baseline:
+            continue
+
+        groups : dict = {"total": current["total"]}
+        groups.update(current["buckets"])
+
+        for group, summary in groups.items():
+            reference = baseline[config]["total"] if group == "total" else baseline[config]["buckets"].get(group)
+            if reference is None:
+                continue
+
+            for metric in METRICS:
+                if metric not in summary or metric not in reference:
+                    continue
+
+                if metric == "time" and reference[metric] < min_time:
+                    continue
+
+                if summary[metric] > reference[metric] * (1 + tolerance):
+                    regressions.append(f"{config} [{group}] {metric}: {reference[metric]:.6g} -> {summary[metric]:.6g}")
+
+            if summary["solved"] < reference["solved"] or summary["suboptimal"] > reference["suboptimal"]:
+                regressions.append(f"{config} [{group}] solved {reference['solved']} -> {summary['solved']}, suboptimal {reference['suboptimal']} -> {summary['suboptimal']}")
+
+    return regressions
+
+def parse_args(argv : list):
+    parser = argparse.ArgumentParser(description="Benchmark the solvers on a fixed corpus of deals.")
+    parser.add_argument("--board", default=c.BOARD_FILE, help="board file")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to draw the corpus")
+    parser.add_argument("--per-bucket", type=int, default=5, help="deals per optimal length bucket")
+    parser.add_argument("--max-deals", type=int, default=2000, help="deals drawn at most to fill the buckets")
+    parser.add_argument("--corpus", default=None, help="corpus file, created if missing")
+    parser.add_argument("--configs", nargs="+", default=CONFIGS, help="solver:heuristic pairs")
+    parser.add_argument("--time-limit", type=float, default=c.DECISION_TIME, help="seconds allowed per deal")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory runs")
+    parser.add_argument("--output", default="bench_results.json", help="results file")
+    parser.add_argument("--baseline", default=None, help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative growth of a metric")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds under which times are not compared")
+
+    return parser.parse_args(argv)
+
+def main(argv : list = None):
+    args = parse_args(argv)
+
+    for config in args.configs:
+        solver, heuristic_name = parse_config(config)
+        if solver not in SOLVERS or heuristic_name not in heuristic.ESTIMATORS:
+            sys.exit(f"Unknown configuration: {config}")
+
+    board = load_board(args.board)
+
+    # The corpus is kept on disk so later runs use exactly the same deals
+    if args.corpus and os.path.exists(args.corpus):
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            corpus : list = json.load(f)
+    else:
+        corpus : list = build_corpus(board, args.seed, args.per_bucket, args.time_limit, args.max_deals)
+
+        if args.corpus:
+            with open(args.corpus, "w", encoding="utf-8") as f:
+                json.dump(corpus, f)
+
+    start : float = time.perf_counter()
+    results : dict = run(board, corpus, args.configs, args.time_limit, not args.no_memory)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"board": board.get_layout_hash(), "deals": len(corpus), "results": results}, f, indent=2)
+
+    for config, result in results.items():
+        total : dict = result["total"]
+        print(f"{config:22} solved {total['solved']}/{total['deals']}  time {total['time']:8.3f} s  expanded {total['expanded']:9}  {total['nodes_per_sec']:9.0f} nodes/s")
+
+    print(f"Benchmark done in {time.perf_counter() - start:.1f} s, results in {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline : dict = json.load(f)["results"]
+
+        regressions : list = compare(results, baseline, args.tolerance, args.min_time)
+        for line in regressions:
+            print("REGRESSION " + line)
+
+        if regressions:
+            sys.exit(1)
+
+        print("No regression against " + args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import math
+from collections import deque
+
+import consts as c
+import state as st
+import moves
+import heuristic
+
+from astar import reconstruct_path
+from board import Board
+from openlist import HeapOpenList
+
+# The goal only constrains the goal pawn, so the backward side enumerates the
+# squares from which the goal pawn reaches the goal on its own, for a given
+# placement of the other pawns (the "blockers"). Those states are stored with
+# their distance to the goal in a shared index that the forward A* consults
+# for every state it generates.
+
+class BackwardIndex:
+    def __init__(self, board : Board, depth : int):
+        self.depth : int = depth
+        self.goal_cell : int = st.encode_pos(board.get_goal())
+        self.goal_index : int = board.get_goal_color() - 1
+        self.goal_shift : int = self.goal_index * c.PAWN_BITS
+        self.stops : dict = board.get_stop_table()
+        self.steps : dict = moves.build_step_table(board.topology)
+
+        # Lower bound used to skip states that cannot be within depth of the goal
+        self.ray : list = heuristic.ray_table(board)
+
+        self.distances : dict = {}     # packed state -> moves of the goal pawn alone
+        self.expanded : set = set()    # blocker placements already searched
+
+    def lookup(self, state : int):
+        goal_pawn_cell : int = (state >> self.goal_shift) & c.PAWN_MASK
+
+        if self.ray[goal_pawn_cell] > self.depth:
+            return None
+
+        signature : int = state & ~(c.PAWN_MASK << self.goal_shift)
+        if signature not in self.expanded:
+            self.expand(signature)
+
+        return self.distances.get(state)
+
+    def expand(self, signature : int) -> None:
+        # Breadth-first search from the goal over predecessor squares of the goal pawn
+        self.expanded.add(signature)
+
+        blockers : set = set()
+        for i in range(c.PAWN_NUMBER):
+            if i != self.goal_index:
+                blockers.add(st.get_cell(signature, i))
+
+        if self.goal_cell in blockers:
+            return
+
+        dist : dict = {self.goal_cell: 0}
+        queue : deque = deque()
+        queue.append(self.goal_cell)
+
+        while queue:
+            cell : int = queue.popleft()
+            if dist[cell] == self.depth:
+                continue
+
+            for direction in moves.DIRECTIONS:
+                # A slide in this direction only stops here if a wall or a pawn is next
+                beyond : int = self.steps[direction][cell]
+                if beyond != cell and beyond not in blockers:
+                    continue
+
+                # Every free square behind, up to a wall or a pawn, slides onto this one
+                back : int = moves.OPPOSITE[direction]
+                prev : int = cell
+                origin : int = self.steps[back][prev]
+
+                while origin != prev and origin not in blockers:
+                    if origin not in dist:
+                        dist[origin] = dist[cell] + 1
+                        queue.append(origin)
+
+                    prev = origin
+                    origin = self.steps[back][prev]
+
+        for cell, d in dist.items():
+            self.distances[signature | (cell << self.goal_shift)] = d
+
+    def tail(self, state : int) -> list[int]:
+        # Goal pawn moves from state to the goal, following decreasing distances
+        path : list = [state]
+
+        while self.distances[state] > 0:
+            cells : list = [st.get_cell(state, i) for i in range(c.PAWN_NUMBER)]
+
+            for direction in moves.DIRECTIONS:
+                cell : int = moves.slide(self.stops, cells, self.goal_index, direction)
+                next_state : int = st.set_cell(state, self.goal_index, cell)
+
+                if self.distances.get(next_state) == self.distances[state] - 1:
+                    state = next_state
+                    break
+
+            path.append(state)
+
+        return path
+
+def bidirectional(board : Board, h_score, stop_event=None, open_list_type=HeapOpenList, stats=None, depth : int = c.BIDIRECTIONAL_DEPTH) -> list[int]:
+    estimate = heuristic.get_estimator(h_score, board)
+    backward = BackwardIndex(board, depth)
+    stops : dict = board.get_stop_table()
+
+    state : int = st.read_board(board)
+
+    open_list = open_list_type()
+    get_neighbors = moves.get_neighbors
+
+    if stats is not None:
+        open_list = stats.wrap_open_list(open_list)
+        get_neighbors = stats.wrap_neighbors(get_neighbors)
+
+    open_list.push(estimate(state), state)
+
+    closed_set : dict = {}
+    g_score : dict = {state: 0}
+
+    # Best complete path found so far: forward part up to meet, then the goal pawn alone
+    best = math.inf
+    meet = None
+
+    tail = backward.lookup(state)
+    if tail is not None:
+        best, meet = tail, state
+
+    while open_list:
+        if stop_event and stop_event.is_set():
+            return []
+
+        # No state left in the open list can lead to a shorter path
+        if open_list.peek_f() >= best:
+            break
+
+        current_state : int = open_list.pop()
+        next_states = get_neighbors(stops, current_state)
+
+        tentative_g_score : int = g_score[current_state] + 1
+
+        for ns in next_states:
+            if tentative_g_score < g_score.get(ns, math.inf):
+                closed_set[ns] = current_state
+                g_score[ns] = tentative_g_score
+                open_list.push(tentative_g_score + estimate(ns), ns)
+
+                # Meet the backward side
+                tail = backward.lookup(ns)
+                if tail is not None and tentative_g_score + tail < best:
+                    best, meet = tentative_g_score + tail, ns
+
+    if meet is None:
+        return []  # No path found
+
+    # Same order as reconstruct_path: from dest to src
+    forward : list = reconstruct_path(closed_set, meet)
+    return backward.tail(meet)[::-1] + forward[1:]
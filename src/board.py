@@ -1,78 +1,86 @@
 from random import randint
-
-import pygame as pg
+import os
 
 import consts as c
+import state as st
+import moves
+import heuristic
 from cell import Cell
+from topology import Topology
 
 class Board:
     def __init__(self, size: int):
         self.size : int = size
-        self.grid : list = []
-        self.initial_state : list = []
+
+        # Walls and goal squares, shared by the copies of the board
+        self.topology = Topology(size)
+
+        # Pawns and goal: pawn id of every square, and square of every pawn id
+        self.occupancy : list = [0] * (size * size)
+        self.pawns : list = [(-1, -1)] * (c.PAWN_NUMBER + 1)
         self.goal : tuple[int,int] = (-1, -1)
+        self.initial_state : tuple = ()
 
     def create_grid(self, filename : str) -> None:
         try:
-            with open(filename, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            # Parse each line into cells
-            for line in lines:
-                row = []
-                values = line.strip().split(',')
-                for value in values:
-                    collision = int(value)
-                    collide_left = bool(collision & c.COL_LEFT)
-                    collide_right = bool(collision & c.COL_RIGHT)
-                    collide_up = bool(collision & c.COL_UP)
-                    collide_down = bool(collision & c.COL_DOWN)
-                    
-                    cell = Cell(False, 0, collide_left, collide_right, collide_up, collide_down)
-                    row.append(cell)
-                self.grid.append(row)
-
-            # Set goal pawn ids in cells
-            for col_id, col_coords in c.PAWN_GOAL_COORDS.items():
-                for coord in col_coords:
-                    x : int = coord[0]
-                    y : int = coord[1]
-
-                    self.grid[y][x].goal_pawn_id = col_id
+            self.topology.load(filename)
+
+            # Board size and pawn count are read from the file
+            c.set_geometry(self.topology.size, self.topology.pawn_number)
+            self.size = self.topology.size
+            self.clear()
+
+            # Walls never change, so slides can be precomputed once
+            self.topology.stops = moves.build_stop_table(self.topology)
+            self.topology.layout_hash = self.topology.compute_layout_hash()
+
+            # Heuristic tables of every goal square, saved next to the board file
+            self.topology.goal_tables = heuristic.get_goal_tables(self, os.path.splitext(filename)[0] + c.GOAL_TABLES_EXT)
+            self.topology.pattern_file = os.path.splitext(filename)[0] + c.PATTERN_DB_EXT
+            self.topology.board_file = filename
         except IOError:
             print("Error: File not found.")
 
+    def copy(self) -> "Board":
+        # The topology is shared, only the pawns and the goal are copied
+        board = Board.__new__(Board)
+        board.size = self.size
+        board.topology = self.topology
+        board.occupancy = list(self.occupancy)
+        board.pawns = list(self.pawns)
+        board.goal = self.goal
+        board.initial_state = self.initial_state
+
+        return board
+
+    def __deepcopy__(self, memo : dict) -> "Board":
+        return self.copy()
+
+    def get_cell(self, x : int, y : int) -> Cell:
+        return Cell(self, x, y)
+
     def clear(self) -> None:
         self.clear_pawns()
         self.clear_goal()
     
     def save_initial_state(self) -> None:
-        self.initial_state = []
-
-        for y in range(self.size):
-            row = []
-            for x in range(self.size):
-                cell = self.grid[y][x]
-            
-                tmp : tuple[bool, int, int] = (cell.is_goal, cell.goal_pawn_id, cell.value)
-                row.append(tmp)
-            self.initial_state.append(row)
-            
+        self.initial_state = (self.goal, tuple(self.pawns))
+
     def load_initial_state(self) -> None:
         if not self.initial_state:
             print("Warning: No initial state saved")
             return
-        
-        # Restore grid to initial state
-        for y in range(self.size):
-            for x in range(self.size):
-                cell = self.grid[y][x]
 
-                is_goal, goal_pawn_id, value = self.initial_state[y][x]
-                
-                cell.is_goal = is_goal
-                cell.goal_pawn_id = goal_pawn_id
-                cell.value = value
+        # Restore goal and pawns to initial state
+        goal, pawns = self.initial_state
+
+        self.clear()
+        if goal != (-1, -1):
+            self.set_as_goal(goal[0], goal[1])
+
+        for pawn_id, (x, y) in enumerate(pawns):
+            if pawn_id > 0 and x != -1:
+                self.set_cell_value(x, y, pawn_id)
 
     def init_pawns(self) -> None:
         pawns_coords : list = self.generate_unique_coordinates()
@@ -83,25 +91,36 @@ class Board:
 
 
     def choose_goal(self) -> None:
-        goal_pawn_id : int = randint(1, c.PAWN_NUMBER)
-        tmp_len : int = len(c.PAWN_GOAL_COORDS[goal_pawn_id])
+        # Only pawns having goal squares on this board can be chosen
+        goals : dict = self.topology.goals
+        pawn_ids : list = sorted(goals)
+
+        goal_pawn_id : int = pawn_ids[randint(0, len(pawn_ids) - 1)]
+        tmp_len : int = len(goals[goal_pawn_id])
         goal_coords_id : int = randint(0, tmp_len - 1)
 
-        goal_x, goal_y = c.PAWN_GOAL_COORDS[goal_pawn_id][goal_coords_id]
+        goal_x, goal_y = goals[goal_pawn_id][goal_coords_id]
 
         self.set_as_goal(goal_x, goal_y)
 
-    def generate_unique_coordinates(self) -> list:
-        # Initial coordinates list for pawns
-        coordinates : list = []
-
-        # Center of the board is non valid
-        illegal_coords : list = [(7,7), (7,8), (8,7), (8,8)]
+    def get_illegal_coordinates(self) -> set:
+        # Squares where no pawn starts a deal.
+        # Center of the board is non valid (2x2 squares, or 1 on odd sizes)
+        low : int = (self.size - 1) // 2
+        high : int = self.size // 2
+        illegal_coords : set = {(x, y) for x in range(low, high + 1) for y in range(low, high + 1)}
 
         # Add goal coordinates to illegal coords
-        for _, tuples in c.PAWN_GOAL_COORDS.items():
+        for _, tuples in self.topology.goals.items():
             for c1, c2 in tuples:
-                illegal_coords.append((c1, c2))
+                illegal_coords.add((c1, c2))
+
+        return illegal_coords
+
+    def generate_unique_coordinates(self) -> list:
+        # Initial coordinates list for pawns
+        coordinates : list = []
+        illegal_coords : set = self.get_illegal_coordinates()
 
         # Generate unique coordinates for each pawn
         while len(coordinates) < c.PAWN_NUMBER:
@@ -109,68 +128,72 @@ class Board:
             y : int = randint(0, self.size - 1)
             coord = (x, y)
 
-            if coord not in illegal_coords:
+            if coord not in illegal_coords and coord not in coordinates:
                 coordinates.append(coord)
         
         return coordinates
 
+    def get_layout_hash(self) -> str:
+        return self.topology.layout_hash
+
+    def get_goal_table(self, name : str):
+        return self.topology.goal_tables.get((name, st.encode_pos(self.goal)))
+
+    def get_stop_table(self) -> dict:
+        return self.topology.stops
+
     def get_goal_color(self) -> int:
         x, y = self.goal
         if (x == -1 or y == -1):
             return 0
-        
-        return self.grid[y][x].goal_pawn_id
+
+        return self.topology.get_goal_id(x, y)
 
     def get_goal(self) -> tuple[int,int]:
         return self.goal
 
     def set_as_goal(self, x : int, y : int) -> None:
-        t_x, t_y = self.goal
-        if (t_x != -1 and t_y != -1):
-            self.grid[t_y][t_x].is_goal = False
-
         self.goal = (x, y)
-        self.grid[y][x].is_goal = True
 
     def clear_goal(self) -> None:
-        x, y = self.goal
-        if (x == -1 or y == -1):
-            return
-
-        self.grid[y][x].is_goal = False
         self.goal = (-1, -1)
 
     def set_cell_value(self, x : int, y : int, val : int) -> None:
-        self.grid[y][x].value = val
-    
+        index : int = y * self.size + x
+
+        # Keep the pawn index in sync with the squares
+        previous : int = self.occupancy[index]
+        if previous > 0:
+            self.pawns[previous] = (-1, -1)
+
+        if val > 0:
+            curr_x, curr_y = self.pawns[val]
+            if curr_x != -1:
+                self.occupancy[curr_y * self.size + curr_x] = 0
+
+            self.pawns[val] = (x, y)
+
+        self.occupancy[index] = val
+
     def get_pawn(self, pawn_id : int) -> tuple[int, int]:
-        # Search the grid for the pawn
-        for y in range(self.size):
-            for x in range(self.size):
-                if self.grid[y][x].value == pawn_id:
-                    return (x, y)
-        
-        # Pawn not found
-        return (-1, -1)
-    
+        # (-1, -1) if the pawn is not on the board
+        return self.pawns[pawn_id]
+
     def set_pawn(self, destination : tuple[int, int], pawn_id : int) -> None:
         # Unpack destination
         x, y = destination
-        
+
         # Validate coordinates
         if x < 0 or x >= self.size or y < 0 or y >= self.size:
             print(f"Warning: Attempted to set pawn position to invalid coordinates ({x}, {y})")
             return
-            
-        # Avoids duplicating pawns
-        curr_x, curr_y = self.get_pawn(pawn_id)
-        self.grid[y][x].value = pawn_id
-        self.grid[curr_y][curr_x].value = 0
+
+        # Also removes the pawn from its previous square
+        self.set_cell_value(x, y, pawn_id)
 
     def clear_pawns(self) -> None:
-        for y in range(self.size):
-            for x in range(self.size):
-                self.grid[y][x].value = 0
+        self.occupancy = [0] * (self.size * self.size)
+        self.pawns = [(-1, -1)] * (c.PAWN_NUMBER + 1)
 
     def move_pawn(self, pawn_id : int, direction : int) -> bool:
         # Get current position
@@ -219,41 +242,37 @@ class Board:
         # Unpack current position
         x, y = current
         size = self.size
-        cell = self.grid[y][x]
+        index = y * size + x
+        walls = self.topology.walls
+        occupancy = self.occupancy
 
         # Up
         if direction == c.MOVE_UP:
-            if y > 0 and not cell.collide_up:
-                neighbor_cell = self.grid[y - 1][x]
-                if not neighbor_cell.collide_down and neighbor_cell.value == 0:
+            if y > 0 and not walls[index] & c.COL_UP:
+                neighbor = index - size
+                if not walls[neighbor] & c.COL_DOWN and occupancy[neighbor] == 0:
                     return (x, y - 1)
 
         # Down
         if direction == c.MOVE_DOWN:
-            if y < size - 1 and not cell.collide_down:
-                neighbor_cell = self.grid[y + 1][x]
-                if not neighbor_cell.collide_up and neighbor_cell.value == 0:
+            if y < size - 1 and not walls[index] & c.COL_DOWN:
+                neighbor = index + size
+                if not walls[neighbor] & c.COL_UP and occupancy[neighbor] == 0:
                     return (x, y + 1)
-                    
+
         # Left
         if direction == c.MOVE_LEFT:
-            if x > 0 and not cell.collide_left:
-                neighbor_cell = self.grid[y][x - 1]
-                if not neighbor_cell.collide_right and neighbor_cell.value == 0:
+            if x > 0 and not walls[index] & c.COL_LEFT:
+                neighbor = index - 1
+                if not walls[neighbor] & c.COL_RIGHT and occupancy[neighbor] == 0:
                     return (x - 1, y)
-                    
+
         # Right
         if direction == c.MOVE_RIGHT:
-            if x < size - 1 and not cell.collide_right:
-                neighbor_cell = self.grid[y][x + 1]
-                if not neighbor_cell.collide_left and neighbor_cell.value == 0:
+            if x < size - 1 and not walls[index] & c.COL_RIGHT:
+                neighbor = index + 1
+                if not walls[neighbor] & c.COL_LEFT and occupancy[neighbor] == 0:
                     return (x + 1, y)
         
         # No valid neighbor
         return (-1, -1)
-
-    def draw(self, window : pg.Surface) -> None:
-        # Draw all cells
-        for y in range(self.size):
-            for x in range(self.size):
-                self.grid[y][x].draw(window, x, y)
\ No newline at end of file
@@ -0,0 +1,68 @@
+import json, sqlite3
+from collections import OrderedDict
+
+import consts as c
+
+# Two tier cache: a small in-memory LRU in front of an optional sqlite file.
+# Values are anything JSON can store.
+
+class Cache:
+    def __init__(self, path : str = None, table : str = "solutions", size : int = c.CACHE_SIZE):
+        self.size : int = size
+        self.table : str = table
+        self.memory : OrderedDict = OrderedDict()
+        self.hits : int = 0
+        self.misses : int = 0
+        self.db = None
+
+        if path:
+            # Several processes may share the file
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.commit()
+
+    def get(self, key : str):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+
+        if self.db is not None:
+            row = self.db.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+
+            if row is not None:
+                value = json.loads(row[0])
+                self.remember(key, value)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key : str, value) -> None:
+        self.remember(key, value)
+
+        if self.db is not None:
+            self.db.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?)", (key, json.dumps(value)))
+            self.db.commit()
+
+    def remember(self, key : str, value) -> None:
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+
+        # Evict the least recently used entry
+        if len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    def get_counters(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+def deal_key(board, state : int) -> str:
+    x, y = board.get_goal()
+    return f"{board.get_layout_hash()}:{x},{y}:{state}"
@@ -1,12 +1,21 @@
-# Size definitions
+# Size definitions (defaults, replaced by set_geometry when a board file is loaded)
 CELL_SIZE = 40          # Must be greater than 4 to display properly
 NB_CELLS = 16
 
+# Board files: wall masks, goal squares and number of pawns
+BOARD_FILE = "src/board.txt"
+
 # Window constants
+BOARD_PIXELS = 640      # Largest board drawing, cells shrink on bigger boards
 WINDOW_SIZE = CELL_SIZE * NB_CELLS
 WINDOW_GUI_HEIGHT = 150
 WINDOW_TITLE = "Rasende Roboter"
 
+# Frame rates: the loop slows down when a frame changed nothing on screen
+FPS = 60
+IDLE_FPS = 15
+TEXT_CACHE_SIZE = 256
+
 # Color definitions
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
@@ -43,11 +52,69 @@ MOVE_RIGHT = 4
 # Player decision time (in seconds)
 DECISION_TIME = 60
 
+# Game solving in background processes: deals drawn ahead of the current one,
+# worker processes, and time allowed per deal from its computer turn
+PREPARED_DEALS = 3
+SPECULATIVE_WORKERS = 1
+SPECULATIVE_TIME_LIMIT = DECISION_TIME
+
+# Solver service: address, solver processes, deals waiting for a process before
+# new requests are no longer read, requests in progress per connection, and
+# messages waiting to be sent to a client before progress reports are dropped
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 2
+SERVICE_QUEUE_SIZE = 64
+SERVICE_CLIENT_REQUESTS = 16
+SERVICE_OUTBOX_SIZE = 256
+
+# Expansions between two progress reports of the search statistics
+PROGRESS_INTERVAL = 10000
+
+# File receiving the statistics of the computer turns cut short, one JSON line
+# each (None: not written)
+STATS_FILE = None
+
+# Heuristic tables: stored next to the board file, value for unreachable squares
+GOAL_TABLES_EXT = ".htab"
+PATTERN_DB_EXT = ".pdb"
+UNREACHABLE = 255
+
+# Heuristic used by the computer player (see heuristic.ESTIMATORS)
+HEURISTIC = "helper"
+
+# Solver used by the computer player (see solvers.SOLVERS): the anytime solver
+# always has a path to play when the time is up, optimal or not
+SOLVER = "anytime"
+
+# Maximum number of entries kept by the IDA* transposition table
+IDA_TABLE_SIZE = 1 << 20
+
+# Solution and heuristic cache: on-disk file and entries kept in memory
+CACHE_FILE = "src/cache.sqlite"
+CACHE_SIZE = 4096
+
+# Heuristic weights of the successive anytime solver passes, ending with plain A*
+ANYTIME_WEIGHTS = [3.0, 2.0, 1.5, 1.25, 1.0]
+
+# Moves of the goal pawn alone searched backwards from the goal by the bidirectional solver
+BIDIRECTIONAL_DEPTH = 4
+
+# Memory allowed to the external solver for the states it works on (bytes), and
+# the directory of its layer files (None for the system temporary directory)
+EXTERNAL_MEMORY = 64 << 20
+EXTERNAL_DIR = None
+
+# Processes sharing one search in the hash distributed solver (0 for one per core)
+HDA_WORKERS = 0
+
 # Pawn ids
 RED_ID = 1
 GREEN_ID = 2
 BLUE_ID = 3
 YELLOW_ID = 4
+FUCHSIA_ID = 5
+CYAN_ID = 6
 
 # Pawn colors mapping
 PAWN_GOAL = 1
@@ -55,18 +122,36 @@ PAWN_COLORS = {
     RED_ID: RED,
     GREEN_ID: GREEN,
     BLUE_ID: BLUE,
-    YELLOW_ID: YELLOW
-}
-
-# Pawn possible goal coordinates (for 0-15 square grid)
-PAWN_GOAL_COORDS = {
-    RED_ID: [(2,5),(2,14),(11,14),(14,1)],
-    GREEN_ID: [(1,10),(5,4),(13,6),(14,13)],
-    BLUE_ID: [(6,1),(6,13),(11,2),(12,9)],
-    YELLOW_ID: [(1,3),(4,9),(10,7),(9,12)]
+    YELLOW_ID: YELLOW,
+    FUCHSIA_ID: FUCHSIA,
+    CYAN_ID: CYAN
 }
 PAWN_NUMBER = 4
 
+# Packed state layout (4 bits per coordinate on the 16x16 board).
+# ROW_STRIDE is the difference between the packed values of vertically adjacent squares.
+COORD_BITS = 4
+COORD_MASK = (1 << COORD_BITS) - 1
+ROW_STRIDE = 1 << COORD_BITS
+PAWN_BITS = 2 * COORD_BITS
+PAWN_MASK = (1 << PAWN_BITS) - 1
+
+def set_geometry(size : int, pawn_number : int) -> None:
+    # Board size and pawn count come from the board file
+    global NB_CELLS, PAWN_NUMBER, COORD_BITS, COORD_MASK, ROW_STRIDE, PAWN_BITS, PAWN_MASK, CELL_SIZE, WINDOW_SIZE
+
+    NB_CELLS = size
+    PAWN_NUMBER = pawn_number
+
+    COORD_BITS = max(1, (size - 1).bit_length())
+    COORD_MASK = (1 << COORD_BITS) - 1
+    ROW_STRIDE = 1 << COORD_BITS
+    PAWN_BITS = 2 * COORD_BITS
+    PAWN_MASK = (1 << PAWN_BITS) - 1
+
+    CELL_SIZE = min(40, BOARD_PIXELS // size)
+    WINDOW_SIZE = CELL_SIZE * NB_CELLS
+
 # Game states
 STATE_INITIALIZING = 0
 STATE_PLAYER_TURN = 1
@@ -0,0 +1,76 @@
+import time
+
+class Deadline:
+    # Stop event for solvers running without a UI thread: set once the time
+    # budget is spent, or when the optional cancel event is set
+    def __init__(self, seconds : float, cancel_event=None):
+        self.end : float = time.monotonic() + seconds
+        self.cancel_event = cancel_event
+
+    def is_set(self) -> bool:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return True
+
+        return time.monotonic() >= self.end
+
+    def remaining(self) -> float:
+        return max(0.0, self.end - time.monotonic())
+
+class TaskFlags:
+    # Cancel flags of the tasks handed to worker processes, one byte per task in
+    # shared memory: reading one is cheap enough for a check at every expansion.
+    # Slots are reused in turn, so at most `slots` tasks may wait or run at once.
+    # Each slot also holds the time.monotonic() value its time limit counts
+    # from, 0 until the process handing the task over starts the clock.
+    def __init__(self, context, slots : int):
+        self.flags = context.RawArray("b", slots)
+        self.starts = context.RawArray("d", slots)
+        self.next_slot : int = 0
+
+    def allocate(self) -> int:
+        slot : int = self.next_slot
+        self.reset(slot)
+        self.next_slot = (slot + 1) % len(self.flags)
+
+        return slot
+
+    def reset(self, slot : int) -> None:
+        self.flags[slot] = 0
+        self.starts[slot] = 0.0
+
+    def start_clock(self, slot : int) -> None:
+        self.starts[slot] = time.monotonic()
+
+    def cancel(self, slot : int) -> None:
+        self.flags[slot] = 1
+
+class TaskEvent:
+    # Cancel event of one task in a worker process: its flag, or the event
+    # cancelling every task
+    def __init__(self, flags, slot : int, cancel_event=None):
+        self.flags = flags
+        self.slot : int = slot
+        self.cancel_event = cancel_event
+
+    def is_set(self) -> bool:
+        if self.flags[self.slot]:
+            return True
+
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+class TaskDeadline:
+    # Deadline of a task in a worker process, counted from the time the clock of
+    # its slot was started (TaskFlags.start_clock), not from the time the task
+    # was picked up. Never set before the clock starts, unless cancelled.
+    def __init__(self, seconds : float, starts, slot : int, cancel_event=None):
+        self.seconds : float = seconds
+        self.starts = starts
+        self.slot : int = slot
+        self.cancel_event = cancel_event
+
+    def is_set(self) -> bool:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return True
+
+        start : float = self.starts[self.slot]
+        return start > 0 and time.monotonic() >= start + self.seconds
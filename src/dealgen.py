@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import argparse, json, multiprocessing, random, sys
+
+import consts as c
+import state as st
+import heuristic
+
+from astar import astar
+from batch import load_board, draw_deal
+from board import Board
+from deadline import Deadline
+
+# Deals of a requested optimal length. Each random deal is screened with a
+# fast weighted search: a path shorter than the range proves the deal too
+# short. Deals left are solved optimally, and every state of the optimal path
+# is itself a deal whose optimum is the number of moves left on the path, so
+# one search yields a deal of each length up to the one of the deal drawn.
+
+# Candidate deals handed to the generator processes at a time
+BATCH_SIZE : int = 64
+
+def solve_candidate(board : Board, estimate, low : int, time_limit : float) -> list[int]:
+    # Optimal path (dest to src) of the deal on the board, or [] if it is shorter than low
+    deadline = Deadline(time_limit)
+    path : list = astar(board, estimate, deadline, weight=c.ANYTIME_WEIGHTS[0])
+
+    if not path or len(path) - 1 < low:
+        return []
+
+    # The estimate never overestimates: reaching it proves the path optimal
+    if estimate(path[-1]) == len(path) - 1:
+        return path
+
+    # Only paths shorter than the one found are looked for
+    shorter : list = astar(board, estimate, deadline, cost_limit=len(path) - 1)
+
+    if deadline.is_set():
+        return []
+
+    return shorter or path
+
+def harvest(board : Board, estimators : dict, heuristic_name : str, low : int, high : int, time_limit : float) -> list[dict]:
+    goal, state = draw_deal(board)
+
+    # Estimators depend on the goal square only
+    if goal not in estimators:
+        estimators[goal] = heuristic.build_estimator(heuristic_name, board)
+
+    path : list = solve_candidate(board, estimators[goal], low, time_limit)
+    illegal : set = board.get_illegal_coordinates()
+    deals : list = []
+
+    # path[i] is i moves away from the goal, along an optimal path
+    for moves_left, state in enumerate(path):
+        pawns : tuple = st.decode_state(state)
+
+        if low <= moves_left <= high and not any(pos in illegal for pos in pawns):
+            deals.append({
+                "goal": list(goal),
+                "goal_pawn": board.get_goal_color(),
+                "pawns": [list(p) for p in pawns],
+                "moves": moves_left
+            })
+
+    return deals
+
+# Per-process generator context, set once by init_worker
+worker : dict = {}
+
+def init_worker(board_file : str, heuristic_name : str, seed : int, low : int, high : int, time_limit : float) -> None:
+    worker["board"] = load_board(board_file)
+    worker["estimators"] = {}
+    worker["args"] = (heuristic_name, low, high, time_limit)
+    worker["seed"] = seed
+
+def harvest_task(index : int) -> list[dict]:
+    # Each candidate has its own seed, whichever process handles it
+    random.seed(f"{worker['seed']}:{index}")
+
+    deals : list = harvest(worker["board"], worker["estimators"], *worker["args"])
+    for deal in deals:
+        deal["source"] = index
+
+    return deals
+
+def generate_all(board_file : str, count : int, heuristic_name : str, seed : int, low : int, high : int, time_limit : float, workers : int = 1):
+    # Yield count deals, always the same ones for a given seed
+    init_args : tuple = (board_file, heuristic_name, seed, low, high, time_limit)
+    pool = None
+
+    if workers <= 1:
+        init_worker(*init_args)
+    else:
+        pool = multiprocessing.Pool(workers, init_worker, init_args)
+
+    produced : int = 0
+    start : int = 0
+
+    try:
+        while produced < count:
+            indices : range = range(start, start + BATCH_SIZE)
+            start += BATCH_SIZE
+
+            for deals in (pool.imap(harvest_task, indices) if pool else map(harvest_task, indices)):
+                for deal in deals[:count - produced]:
+                    yield dict(deal, deal=produced)
+                    produced += 1
+
+                if produced == count:
+                    break
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+def main(argv : list = None):
+    parser = argparse.ArgumentParser(description="Generate deals of a given optimal length.")
+    parser.add_argument("--board", default=c.BOARD_FILE, help="board file")
+    parser.add_argument("--moves", type=int, default=None, help="optimal number of moves")
+    parser.add_argument("--min", type=int, default=8, help="smallest optimal number of moves")
+    parser.add_argument("--max", type=int, default=None, help="largest optimal number of moves (default: --min)")
+    parser.add_argument("--deals", type=int, default=100, help="number of deals")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--heuristic", choices=heuristic.ADMISSIBLE, default=c.HEURISTIC)
+    parser.add_argument("--time-limit", type=float, default=5.0, help="seconds allowed to solve a candidate deal")
+    parser.add_argument("--workers", type=int, default=1, help="generator processes (0 for one per core)")
+    args = parser.parse_args(argv)
+
+    low : int = args.moves if args.moves is not None else args.min
+    high : int = args.moves if args.moves is not None else (args.max if args.max is not None else low)
+
+    if not 1 <= low <= high:
+        sys.exit("The number of moves must be a positive range")
+
+    workers : int = args.workers or multiprocessing.cpu_count()
+
+    for deal in generate_all(args.board, args.deals, args.heuristic, args.seed, low, high, args.time_limit, workers):
+        sys.stdout.write(json.dumps(deal) + "\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import os, tempfile, time
+
+import numpy as np
+
+import consts as c
+import state as st
+import moves
+import heuristic
+import layered
+
+from board import Board
+
+# Breadth-first search with the layers kept on disk, for searches whose
+# visited set does not fit in memory. Same search as layered.layered (ray
+# bound pruning, bound raised until a solution is found), but:
+#  - the layer being expanded is read from its file a chunk at a time, and the
+#    successors of each chunk are written as a sorted run file;
+#  - duplicates are removed when the runs are merged into the next layer
+#    (delayed duplicate detection), by looking the merged states up in the
+#    files of the previous layers;
+#  - layer files are memory-mapped, so only the chunk being worked on stays
+#    in memory. memory_budget caps the size of that chunk.
+
+# Bytes used per expanded state: successors and parents for every pawn and
+# direction, times the temporary arrays of layered.expand_layer and np.unique
+EXPANSION_FACTOR : int = 8
+
+# Runs merged at once: more runs are first merged by groups into longer runs,
+# so that the part of each run read at a time stays large
+MERGE_FANIN : int = 16
+
+class RunFile:
+    # Sorted states, the state each one comes from and whether it is expanded
+    # (states over the cost bound are only kept as seen), in three flat files
+    FIELDS : tuple = ("states", "parents", "keep")
+
+    def __init__(self, directory : str, name : str, dtype):
+        self.paths : dict = {field: os.path.join(directory, f"{name}.{field}") for field in RunFile.FIELDS}
+        self.dtypes : dict = {"states": dtype, "parents": dtype, "keep": np.bool_}
+        self.files : dict = {field: open(path, "wb") for field, path in self.paths.items()}
+        self.size : int = 0
+        self.kept : int = 0
+
+    def append(self, states : np.ndarray, parents : np.ndarray, keep : np.ndarray) -> None:
+        states.tofile(self.files["states"])
+        parents.tofile(self.files["parents"])
+        keep.tofile(self.files["keep"])
+
+        self.size += len(states)
+        self.kept += int(keep.sum())
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+
+        # Read-only maps of the finished file (mapping an empty file fails)
+        self.arrays : dict = {}
+        for field, path in self.paths.items():
+            if self.size:
+                self.arrays[field] = np.memmap(path, dtype=self.dtypes[field], mode="r")
+            else:
+                self.arrays[field] = np.zeros(0, dtype=self.dtypes[field])
+
+    def delete(self) -> None:
+        self.arrays = {}
+
+        for path in self.paths.values():
+            os.remove(path)
+
+def contains(sorted_states : np.ndarray, states : np.ndarray) -> np.ndarray:
+    # Which states are in the sorted array, looked up by binary search
+    if len(sorted_states) == 0:
+        return np.zeros(len(states), dtype=bool)
+
+    index : np.ndarray = np.minimum(np.searchsorted(sorted_states, states), len(sorted_states) - 1)
+    return sorted_states[index] == states
+
+def merge_runs(runs : list, window : int):
+    # Yield the states of sorted runs in order, window states per run at a time,
+    # each one once with the parent of its first occurrence
+    positions : list = [0] * len(runs)
+
+    while True:
+        ends : list = [min(pos + window, run.size) for run, pos in zip(runs, positions)]
+        active : list = [i for i, run in enumerate(runs) if positions[i] < run.size]
+
+        if not active:
+            return
+
+        # Every state up to the smallest last buffered one is known in full
+        limit = min(runs[i].arrays["states"][ends[i] - 1] for i in active)
+        states : list = []
+        parents : list = []
+
+        for i in active:
+            run_states : np.ndarray = runs[i].arrays["states"]
+            end : int = positions[i] + int(np.searchsorted(run_states[positions[i]:ends[i]], limit, side="right"))
+
+            states.append(np.asarray(run_states[positions[i]:end]))
+            parents.append(np.asarray(runs[i].arrays["parents"][positions[i]:end]))
+            positions[i] = end
+
+        merged, first = np.unique(np.concatenate(states), return_index=True)
+        yield merged, np.concatenate(parents)[first]
+
+def merge_groups(runs : list, window : int, directory : str, name : str, dtype) -> list:
+    # Merge groups of MERGE_FANIN runs until at most MERGE_FANIN runs are left
+    level : int = 0
+
+    while len(runs) > MERGE_FANIN:
+        merged_runs : list = []
+
+        for group_start in range(0, len(runs), MERGE_FANIN):
+            group : list = runs[group_start:group_start + MERGE_FANIN]
+            merged = RunFile(directory, f"{name}-merge{level}-{len(merged_runs)}", dtype)
+
+            for states, parents in merge_runs(group, window):
+                merged.append(states, parents, np.ones(len(states), dtype=bool))
+
+            merged.close()
+            merged_runs.append(merged)
+
+            for run in group:
+                run.delete()
+
+        runs = merged_runs
+        level += 1
+
+    return runs
+
+def reconstruct_path(layers : list, state : int) -> list[int]:
+    # Same order as astar.reconstruct_path: from dest to src
+    path : list = [state]
+
+    for layer in reversed(layers[1:]):
+        states : np.ndarray = layer.arrays["states"]
+        state = int(layer.arrays["parents"][int(np.searchsorted(states, state))])
+        path.append(state)
+
+    return path
+
+def external(board : Board, h_score, stop_event=None, stats=None, memory_budget : int = c.EXTERNAL_MEMORY, directory : str = c.EXTERNAL_DIR) -> list[int]:
+    # h_score is only accepted for the common solver interface, pruning uses
+    # the ray table as layered.layered does
+    goal_cell : int = st.encode_pos(board.get_goal())
+    goal_shift : int = (board.get_goal_color() - 1) * c.PAWN_BITS
+
+    dtype = layered.state_type()
+    stops : dict = layered.build_stop_arrays(board)
+    ray : np.ndarray = np.frombuffer(heuristic.get_table("ray", board), dtype=np.uint8)
+
+    # States expanded at once, and states read from each run when merging
+    per_state : int = c.PAWN_NUMBER * len(moves.DIRECTIONS) * 2 * np.dtype(dtype).itemsize * EXPANSION_FACTOR
+    chunk : int = max(1, memory_budget // per_state)
+
+    start : int = st.read_board(board)
+    if (start >> goal_shift) & c.PAWN_MASK == goal_cell:
+        return [start]
+
+    bound : int = int(ray[(start >> goal_shift) & c.PAWN_MASK])
+
+    with tempfile.TemporaryDirectory(prefix="external-", dir=directory) as root:
+        while bound < c.UNREACHABLE:
+            if stats is not None:
+                stats.f_bound = bound
+
+            first = RunFile(root, f"{bound}-0", dtype)
+            first.append(np.array([start], dtype=dtype), np.array([start], dtype=dtype), np.ones(1, dtype=bool))
+            first.close()
+
+            layers : list = [first]
+            pruned : bool = False
+
+            for depth in range(bound):
+                layer : RunFile = layers[-1]
+
+                if layer.kept == 0:
+                    break
+
+                # Sorted runs of the successors, one per chunk of the layer
+                runs : list = []
+
+                for offset in range(0, layer.size, chunk):
+                    if stop_event and stop_event.is_set():
+                        return []
+
+                    expand_start : float = time.perf_counter()
+                    keep : np.ndarray = np.asarray(layer.arrays["keep"][offset:offset + chunk])
+                    states : np.ndarray = np.asarray(layer.arrays["states"][offset:offset + chunk])[keep]
+
+                    successors, origins = layered.expand_layer(stops, states)
+                    successors, first_index = np.unique(successors, return_index=True)
+
+                    run = RunFile(root, f"{bound}-{depth + 1}-run{len(runs)}", dtype)
+                    run.append(successors, origins[first_index], np.ones(len(successors), dtype=bool))
+                    run.close()
+                    runs.append(run)
+
+                    if stats is not None:
+                        stats.expanded += len(states)
+                        stats.generated += len(successors)
+                        stats.neighbor_time += time.perf_counter() - expand_start
+
+                # Merge the runs into the next layer, without the states already seen
+                window : int = max(1, chunk // MERGE_FANIN)
+                runs = merge_groups(runs, window, root, f"{bound}-{depth + 1}", dtype)
+
+                next_layer = RunFile(root, f"{bound}-{depth + 1}", dtype)
+                found = None
+
+                for states, parents in merge_runs(runs, window):
+                    new : np.ndarray = np.ones(len(states), dtype=bool)
+                    for seen in layers:
+                        new &= ~contains(seen.arrays["states"], states)
+
+                    states, parents = states[new], parents[new]
+
+                    # Keep the states whose goal pawn can still reach the goal within the bound
+                    goal_cells : np.ndarray = (states >> goal_shift) & c.PAWN_MASK
+                    keep = ray[goal_cells].astype(np.int32) + depth + 1 <= bound
+                    pruned = pruned or not keep.all()
+
+                    next_layer.append(states, parents, keep)
+
+                    at_goal : np.ndarray = states[goal_cells == goal_cell]
+                    if found is None and len(at_goal):
+                        found = int(at_goal[0])
+
+                next_layer.close()
+                layers.append(next_layer)
+
+                for run in runs:
+                    run.delete()
+
+                if stats is not None:
+                    stats.open_high_water = max(stats.open_high_water, next_layer.size)
+
+                if found is not None:
+                    return reconstruct_path(layers, found)
+
+            for layer in layers:
+                layer.delete()
+
+            if not pruned:
+                break  # Whole reachable space searched
+
+            bound += 1
+
+    return []  # No path found
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import argparse, random, sys
+
+import consts as c
+
+# Random board files for other sizes and pawn counts, built like the original
+# board: a walled center block, an L shaped corner on every goal square and
+# a few walls along the edges.
+
+CORNERS : list = [(c.COL_UP, c.COL_LEFT), (c.COL_UP, c.COL_RIGHT), (c.COL_DOWN, c.COL_LEFT), (c.COL_DOWN, c.COL_RIGHT)]
+
+# Wall on the other side of a cell border: mask, x offset, y offset
+FACING : dict = {
+    c.COL_LEFT: (c.COL_RIGHT, -1, 0),
+    c.COL_RIGHT: (c.COL_LEFT, 1, 0),
+    c.COL_UP: (c.COL_DOWN, 0, -1),
+    c.COL_DOWN: (c.COL_UP, 0, 1)
+}
+
+def add_wall(walls : list, size : int, x : int, y : int, mask : int) -> None:
+    walls[y][x] |= mask
+
+    other, dx, dy = FACING[mask]
+    if 0 <= x + dx < size and 0 <= y + dy < size:
+        walls[y + dy][x + dx] |= other
+
+def generate(size : int, pawn_number : int, goals_per_pawn : int, seed : int) -> str:
+    rng = random.Random(seed)
+    walls : list = [[0] * size for _ in range(size)]
+
+    # Center block, where no pawn may stand
+    low : int = (size - 1) // 2
+    high : int = size // 2
+    for i in range(low, high + 1):
+        add_wall(walls, size, i, low, c.COL_UP)
+        add_wall(walls, size, i, high, c.COL_DOWN)
+        add_wall(walls, size, low, i, c.COL_LEFT)
+        add_wall(walls, size, high, i, c.COL_RIGHT)
+
+    # Goal squares, away from the edges, the center and each other
+    taken : set = {(x, y) for x in range(low - 1, high + 2) for y in range(low - 1, high + 2)}
+    goals : list = []
+
+    for pawn_id in range(1, pawn_number + 1):
+        for _ in range(goals_per_pawn):
+            while True:
+                x, y = rng.randint(1, size - 2), rng.randint(1, size - 2)
+                if (x, y) not in taken:
+                    break
+
+            taken.update((x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+            goals.append((pawn_id, x, y))
+
+            for mask in rng.choice(CORNERS):
+                add_wall(walls, size, x, y, mask)
+
+    # Two walls across each edge
+    for _ in range(2):
+        add_wall(walls, size, rng.randint(1, size - 2), 0, c.COL_RIGHT)
+        add_wall(walls, size, rng.randint(1, size - 2), size - 1, c.COL_RIGHT)
+        add_wall(walls, size, 0, rng.randint(1, size - 2), c.COL_DOWN)
+        add_wall(walls, size, size - 1, rng.randint(1, size - 2), c.COL_DOWN)
+
+    lines : list = [f"# Generated board: size {size}, {pawn_number} pawns, seed {seed}", ""]
+    lines += [",".join(str(v) for v in row) for row in walls]
+    lines += ["", f"pawns {pawn_number}", ""]
+    lines += [f"goal {pawn_id} {x} {y}" for pawn_id, x, y in goals]
+
+    return "\n".join(lines) + "\n"
+
+def main(argv : list = None):
+    parser = argparse.ArgumentParser(description="Generate a random board file.")
+    parser.add_argument("--size", type=int, default=c.NB_CELLS, help="squares per side")
+    parser.add_argument("--pawns", type=int, default=c.PAWN_NUMBER, help="number of pawns")
+    parser.add_argument("--goals", type=int, default=4, help="goal squares per pawn")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", default=None, help="board file (standard output if omitted)")
+    args = parser.parse_args(argv)
+
+    if args.pawns > len(c.PAWN_COLORS):
+        sys.exit(f"At most {len(c.PAWN_COLORS)} pawns can be drawn")
+
+    text : str = generate(args.size, args.pawns, args.goals, args.seed)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+if __name__ == "__main__":
+    main()
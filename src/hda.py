@@ -0,0 +1,489 @@
+import atexit, math, multiprocessing, queue, time
+
+import consts as c
+import state as st
+import moves
+import heuristic
+
+from astar import astar
+from board import Board
+from openlist import HeapOpenList
+
+# Hash distributed A* (HDA*): one search shared by several processes. Each
+# state is owned by the process picked by a hash of the state: only the owner
+# keeps its cost and parent, evaluates it and expands it. Successors are sent
+# to their owners in batches of packed ints, through one ring of shared memory
+# per process: nothing is pickled on the way.
+#
+# A path is only known to be optimal once no state with f below its length is
+# left anywhere, neither in an open list nor in a ring. The length of the best
+# path is shared, so states that cannot beat it are dropped. Each process
+# counts the batches it sends and receives, and flags itself idle when it has
+# nothing left to expand nor to send. The search is over when two successive
+# reads of the counters find every process idle and as many batches received
+# as sent, with no change between the two reads. They are read each time a
+# process turns idle.
+#
+# Processes are started on the first search of a board and kept for the next
+# ones. Messages other than states go through one pipe per process. The path is
+# read back from the owners of its states, one at a time.
+
+# Messages to the search processes
+SEARCH : int = 0 # (SEARCH, search id, goal, start state, heuristic name)
+TRACE : int = 1  # (TRACE, search id, state): parent of a state owned by the process
+END : int = 2    # (END, search id): the states of the search can be dropped
+QUIT : int = 3
+
+# Replies of the search processes
+READY : int = 0  # (READY, search id)
+PARENT : int = 1 # (PARENT, search id, state, parent)
+
+# Counters of each process, written by the process alone
+IDLE, SENT, RECEIVED, EXPANDED, GENERATED, OPEN_SIZE = range(6)
+FIELDS : int = 6
+
+# Best path length before any path is found
+NO_PATH : int = 1 << 62
+
+# Words of the ring of each process: 2 per batch and 3 per state
+RING_WORDS : int = 1 << 18
+
+# Expansions between two reads of the ring, seconds between two attempts to
+# send to a full ring, and seconds between two progress reports
+EXPANSIONS_PER_POLL : int = 64
+RETRY_INTERVAL : float = 0.001
+REPORT_INTERVAL : float = 0.05
+
+# Fibonacci hashing: states differing by one pawn land on different processes
+HASH_MULTIPLIER : int = 0x9E3779B97F4A7C15
+HASH_MASK : int = (1 << 64) - 1
+
+def owner(state : int, workers : int) -> int:
+    return (((state * HASH_MULTIPLIER) & HASH_MASK) >> 32) % workers
+
+class Ring:
+    # Batches of states sent to one process by all the others, one after the
+    # other: search id, state count, then state, g and parent of each state
+    def __init__(self, context, words : int):
+        self.words = context.RawArray("Q", words)
+        self.positions = context.RawArray("Q", 2) # Words written and read so far
+        self.lock = context.Lock()
+
+    def put(self, search_id : int, states : list, counters=None, counter : int = 0) -> int:
+        # Write as many states (flat state, g, parent list) as there is room for,
+        # return their count. The batch is counted as sent before it can be read.
+        with self.lock:
+            size : int = len(self.words)
+            written, read = self.positions[0], self.positions[1]
+            count : int = min(len(states) // 3, (size - (written - read) - 2) // 3)
+
+            if count <= 0:
+                return 0
+
+            batch : list = [search_id, count] + states[:3 * count]
+            start : int = written % size
+            split : int = min(len(batch), size - start)
+
+            self.words[start:start + split] = batch[:split]
+            self.words[0:len(batch) - split] = batch[split:]
+
+            if counters is not None:
+                counters[counter] += 1
+
+            self.positions[0] = written + len(batch)
+
+        return count
+
+    def take(self) -> list:
+        # Every word written since the last call
+        with self.lock:
+            size : int = len(self.words)
+            written, read = self.positions[0], self.positions[1]
+
+            if written == read:
+                return []
+
+            start : int = read % size
+            end : int = start + written - read
+            words : list = self.words[start:min(end, size)] + self.words[0:max(end - size, 0)]
+            self.positions[1] = written
+
+        return words
+
+def read_batches(words : list):
+    # (search id, [state, g, parent, ...]) of each batch taken from a ring
+    position : int = 0
+
+    while position < len(words):
+        end : int = position + 2 + 3 * words[position + 1]
+        yield words[position], words[position + 2:end]
+        position = end
+
+class Partition:
+    # The states of a search owned by one process
+    def __init__(self, index : int, workers : int, board : Board, estimate, search_id : int, rings : list, wakes : list, counters, incumbent, lock):
+        self.index : int = index
+        self.workers : int = workers
+        self.search_id : int = search_id
+
+        self.stops : dict = board.get_stop_table()
+        self.goal_cell : int = st.encode_pos(board.get_goal())
+        self.goal_shift : int = (board.get_goal_color() - 1) * c.PAWN_BITS
+        self.estimate = estimate
+
+        self.rings : list = rings
+        self.wakes : list = wakes
+        self.counters = counters
+        self.base : int = index * FIELDS
+
+        # Shared best path: search id, length and goal state, under the lock
+        self.incumbent = incumbent
+        self.lock = lock
+        self.cost : int = NO_PATH
+
+        self.g_score : dict = {}
+        self.parents : dict = {}
+        self.open_list = HeapOpenList()
+        self.outgoing : list = [[] for _ in range(workers)]
+
+        # Copied to the shared counters with each flush
+        self.expanded : int = 0
+        self.generated : int = 0
+
+    def add(self, state : int, g : int, parent : int) -> None:
+        if g >= self.g_score.get(state, math.inf):
+            return
+
+        f : int = g + self.estimate(state)
+        if f >= self.cost:
+            return
+
+        self.g_score[state] = g
+        self.parents[state] = parent
+
+        if (state >> self.goal_shift) & c.PAWN_MASK == self.goal_cell:
+            self.publish(g, state)
+        else:
+            self.open_list.push(f, state)
+
+    def publish(self, cost : int, state : int) -> None:
+        with self.lock:
+            # A process may still be busy with the last search when the next one starts
+            if self.incumbent[0] == self.search_id and cost < self.incumbent[1]:
+                self.incumbent[1], self.incumbent[2] = cost, state
+
+        self.refresh()
+
+    def refresh(self) -> None:
+        with self.lock:
+            if self.incumbent[0] == self.search_id:
+                self.cost = self.incumbent[1]
+
+    def receive(self, states : list) -> None:
+        values = iter(states)
+        for state, g, parent in zip(values, values, values):
+            self.add(state, g, parent)
+
+    def sending(self) -> bool:
+        # States left over by a full ring
+        return any(self.outgoing)
+
+    def expand(self, count : int) -> bool:
+        # Expand up to count states, False once none is left below the best length
+        # or while a full ring holds back the last successors: expanding on would
+        # go deeper without the states of lower f the other processes may send
+        self.refresh()
+        self.flush()
+
+        if self.sending():
+            return False
+
+        for _ in range(count):
+            if not self.open_list or self.open_list.peek_f() >= self.cost:
+                self.flush()
+                return False
+
+            state : int = self.open_list.pop()
+            g : int = self.g_score[state] + 1
+
+            next_states : list = moves.get_neighbors(self.stops, state)
+            self.expanded += 1
+            self.generated += len(next_states)
+
+            for ns in next_states:
+                index : int = owner(ns, self.workers)
+
+                if index == self.index:
+                    self.add(ns, g, state)
+                else:
+                    self.outgoing[index].extend((ns, g, state))
+
+        self.flush()
+        return True
+
+    def flush(self) -> None:
+        # What a full ring cannot take waits for the next flush
+        for index, states in enumerate(self.outgoing):
+            if states:
+                count : int = self.rings[index].put(self.search_id, states, self.counters, self.base + SENT)
+
+                if count:
+                    del states[:3 * count]
+                    self.wakes[index].set()
+
+        self.counters[self.base + EXPANDED] = self.expanded
+        self.counters[self.base + GENERATED] = self.generated
+        self.counters[self.base + OPEN_SIZE] = len(self.open_list)
+
+def run_worker(index : int, workers : int, board_file : str, control, rings : list, wakes : list, replies, settled, counters, incumbent, lock) -> None:
+    # Imported here: batch imports the solvers, this module among them
+    from batch import load_board, setup_deal
+
+    board = load_board(board_file)
+    ring : Ring = rings[index]
+    wake = wakes[index]
+    base : int = index * FIELDS
+
+    estimators : dict = {}
+    partition = None
+
+    while True:
+        busy : bool = partition is not None and partition.expand(EXPANSIONS_PER_POLL)
+        sending : bool = partition is not None and partition.sending()
+
+        if not busy:
+            if not sending and not counters[base + IDLE]:
+                counters[base + IDLE] = 1
+                settled.set()
+
+            # Sleep until states or a message come, or until a full ring may
+            # have room again. Cleared before the ring and the pipe are read:
+            # whatever comes after wakes the process up on the next wait.
+            wake.wait(RETRY_INTERVAL if sending else None)
+            wake.clear()
+
+        while control.poll():
+            message : tuple = control.recv()
+            kind : int = message[0]
+
+            if kind == SEARCH:
+                _, search_id, goal, start, heuristic_name = message
+                setup_deal(board, goal, start)
+
+                if (heuristic_name, goal) not in estimators:
+                    estimators[(heuristic_name, goal)] = heuristic.build_estimator(heuristic_name, board)
+
+                partition = Partition(index, workers, board, estimators[(heuristic_name, goal)], search_id, rings, wakes, counters, incumbent, lock)
+                counters[base:base + FIELDS] = [0] * FIELDS
+                counters[base + IDLE] = 1
+
+                replies.put((READY, search_id))
+            elif kind == TRACE:
+                if partition is not None and message[1] == partition.search_id:
+                    replies.put((PARENT, message[1], message[2], partition.parents[message[2]]))
+            elif kind == END:
+                if partition is not None and message[1] == partition.search_id:
+                    partition = None
+            elif kind == QUIT:
+                return
+
+        # Batches left over from a finished search are dropped
+        batches : list = [states for search_id, states in read_batches(ring.take())
+                          if partition is not None and search_id == partition.search_id]
+
+        if batches:
+            # Flagged busy before the batches are counted: once a read of the
+            # counters finds them received, the next one finds the process busy,
+            # or done with them and with the batches they led it to send.
+            # Counted the other way round, two reads could find every process
+            # idle and as many batches received as sent while these are expanded.
+            counters[base + IDLE] = 0
+            counters[base + RECEIVED] += len(batches)
+
+            for states in batches:
+                partition.receive(states)
+
+class SearchProcesses:
+    # Processes sharing the searches on one board file
+    def __init__(self, board_file : str, workers : int):
+        # Fresh interpreters: the processes do not inherit the pygame state
+        context = multiprocessing.get_context("spawn")
+
+        self.workers : int = workers
+        pipes : list = [context.Pipe(duplex=False) for _ in range(workers)]
+        self.controls : list = [sender for _, sender in pipes]
+        self.rings : list = [Ring(context, RING_WORDS) for _ in range(workers)]
+        self.wakes : list = [context.Event() for _ in range(workers)]
+        self.replies = context.Queue()
+        self.settled = context.Event()
+        self.counters = context.RawArray("q", workers * FIELDS)
+        self.incumbent = context.RawArray("Q", 3)
+        self.lock = context.Lock()
+        self.search_id : int = 0
+
+        self.processes : list = [context.Process(target=run_worker, daemon=True,
+                                                 args=(index, workers, board_file, pipes[index][0], self.rings, self.wakes, self.replies,
+                                                       self.settled, self.counters, self.incumbent, self.lock))
+                                 for index in range(workers)]
+        for process in self.processes:
+            process.start()
+
+    def send(self, index : int, message : tuple) -> None:
+        self.controls[index].send(message)
+        self.wakes[index].set()
+
+    def wait_reply(self, kind : int, stop_event) -> tuple:
+        # Next reply of the current search, None if the stop event fires first
+        while not (stop_event and stop_event.is_set()):
+            try:
+                reply : tuple = self.replies.get(timeout=0.1)
+            except queue.Empty:
+                if not all(process.is_alive() for process in self.processes):
+                    raise RuntimeError("A search process has stopped")
+                continue
+
+            if reply[0] == kind and reply[1] == self.search_id:
+                return reply
+
+        return None
+
+    def read_counters(self) -> tuple:
+        # Every process idle, batches sent (the start state by this process among
+        # them) and batches received
+        idle : bool = all(self.counters[i * FIELDS + IDLE] for i in range(self.workers))
+        sent : int = 1 + sum(self.counters[i * FIELDS + SENT] for i in range(self.workers))
+        received : int = sum(self.counters[i * FIELDS + RECEIVED] for i in range(self.workers))
+
+        return (idle, sent, received)
+
+    def update_stats(self, stats) -> None:
+        fields : list = [self.counters[i * FIELDS:(i + 1) * FIELDS] for i in range(self.workers)]
+        expanded : int = sum(f[EXPANDED] for f in fields)
+        report : bool = expanded // stats.progress_interval > stats.expanded // stats.progress_interval
+
+        stats.expanded = expanded
+        stats.generated = sum(f[GENERATED] for f in fields)
+        stats.open_high_water = max(stats.open_high_water, sum(f[OPEN_SIZE] for f in fields))
+
+        if report and stats.on_progress is not None:
+            stats.on_progress(stats)
+
+    def solve(self, board : Board, heuristic_name : str, stop_event=None, stats=None, lower : int = 0) -> list[int]:
+        self.search_id += 1
+
+        # The f values popped by one process bound nothing: states of lower f may
+        # wait in other processes or in the queues. Only the estimate of the start
+        # and the length of the path found are proven bounds.
+        if stats is not None:
+            stats.f_bound = max(stats.f_bound, lower)
+
+        with self.lock:
+            self.incumbent[:] = [self.search_id, NO_PATH, 0]
+
+        goal : tuple = board.get_goal()
+        start : int = st.read_board(board)
+
+        for index in range(self.workers):
+            self.send(index, (SEARCH, self.search_id, goal, start, heuristic_name))
+
+        try:
+            # A batch reaching a process before the search would be taken for a
+            # leftover of the last one: no state is sent before every process is ready
+            for _ in range(self.workers):
+                if self.wait_reply(READY, stop_event) is None:
+                    return []
+
+            # The ring of the owner may still be full of batches of the last search
+            index : int = owner(start, self.workers)
+            while not self.rings[index].put(self.search_id, [start, 0, start]):
+                self.wakes[index].set()
+                time.sleep(RETRY_INTERVAL)
+
+            self.wakes[index].set()
+
+            while True:
+                if stop_event and stop_event.is_set():
+                    return []
+
+                # Cleared before the counters are read: a process turning idle
+                # afterwards wakes this one up on the next wait
+                self.settled.wait(REPORT_INTERVAL)
+                self.settled.clear()
+
+                counters : tuple = self.read_counters()
+
+                if stats is not None:
+                    self.update_stats(stats)
+
+                idle, sent, received = counters
+                if idle and sent == received and counters == self.read_counters():
+                    break
+
+            if self.incumbent[1] == NO_PATH:
+                return [] # No path found
+
+            # Same order as astar.reconstruct_path: from dest to src
+            path : list = [int(self.incumbent[2])]
+
+            while path[-1] != start:
+                self.send(owner(path[-1], self.workers), (TRACE, self.search_id, path[-1]))
+                reply : tuple = self.wait_reply(PARENT, stop_event)
+
+                if reply is None:
+                    return []
+
+                path.append(reply[3])
+
+            if stats is not None:
+                stats.f_bound = len(path) - 1
+
+            return path
+        finally:
+            for index in range(self.workers):
+                self.send(index, (END, self.search_id))
+
+    def close(self) -> None:
+        for index in range(self.workers):
+            try:
+                self.send(index, (QUIT,))
+            except BrokenPipeError:
+                pass # Already stopped along with the interpreter
+
+        for process in self.processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+
+# Search processes of each board file and process count, kept between searches
+search_processes : dict = {}
+
+def close_all() -> None:
+    for processes in search_processes.values():
+        processes.close()
+
+    search_processes.clear()
+
+atexit.register(close_all)
+
+def hda(board : Board, h_score, stop_event=None, stats=None, workers : int = c.HDA_WORKERS) -> list[int]:
+    workers = workers or multiprocessing.cpu_count()
+
+    # A single process gains nothing, the processes of a pool (batch and
+    # service workers) may not start processes, and the rings only hold states
+    # of up to 64 bits: search in this process instead
+    fits : bool = c.PAWN_BITS * c.PAWN_NUMBER <= 64
+
+    if workers <= 1 or multiprocessing.current_process().daemon or not board.topology.board_file or not fits:
+        return astar(board, h_score, stop_event, stats=stats)
+
+    # The processes build the estimator again from its name, the closure itself
+    # cannot be sent to them
+    heuristic_name : str = getattr(h_score, "heuristic", c.HEURISTIC)
+
+    key : tuple = (board.topology.board_file, workers)
+    if key not in search_processes:
+        search_processes[key] = SearchProcesses(board.topology.board_file, workers)
+
+    lower : int = heuristic.get_estimator(h_score, board)(st.read_board(board))
+
+    return search_processes[key].solve(board, heuristic_name, stop_event, stats, lower)
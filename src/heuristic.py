@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+from collections import deque
+import math, copy, random, threading
+
+import consts as c
+import state as st
+import moves
+
+# Estimators give a lower bound of the number of moves left from a packed state.
+# They are built for a board whose goal has been chosen, and are plain callables
+# so they can be handed to the solvers in place of the per-cell dictionary.
+# Per-cell tables are bytes indexed by packed cell, c.UNREACHABLE marking squares
+# the goal pawn cannot reach.
+
+def build_h_table(h_score : dict) -> list:
+    # Heuristic indexed by the packed cell of the goal pawn
+    return [h_score.get(st.decode_pos(i), math.inf) for i in range(c.PAWN_MASK + 1)]
+
+def table_estimator(table : list, goal_index : int):
+    shift : int = goal_index * c.PAWN_BITS
+
+    def estimate(state : int):
+        return table[(state >> shift) & c.PAWN_MASK]
+
+    return estimate
+
+def get_estimator(h_score, board):
+    # Solvers accept either an estimator or the legacy per-cell dictionary
+    if callable(h_score):
+        return h_score
+
+    return table_estimator(build_h_table(h_score), board.get_goal_color() - 1)
+
+def slide_table(board, goal : tuple[int, int] = None) -> bytes:
+    # Breadth-first search of the goal pawn sliding from the goal on the empty
+    # board (the heuristic historically computed in main.run)
+    stops : dict = board.get_stop_table()
+    goal_cell : int = st.encode_pos(goal if goal is not None else board.get_goal())
+
+    table = bytearray([c.UNREACHABLE] * (c.PAWN_MASK + 1))
+    table[goal_cell] = 0
+
+    queue : deque = deque()
+    queue.append(goal_cell)
+
+    while queue:
+        cell : int = queue.popleft()
+
+        for direction in moves.DIRECTIONS:
+            n_cell : int = stops[direction][cell]
+
+            if n_cell != cell and table[n_cell] > table[cell] + 1:
+                table[n_cell] = table[cell] + 1
+                queue.append(n_cell)
+
+    return bytes(table)
+
+def ray_table(board, goal : tuple[int, int] = None) -> bytes:
+    # Moves needed by the goal pawn if it could stop on any square of a slide,
+    # as it does when a blocker sits right after that square. Never overestimates.
+    # Stopping anywhere on a slide is symmetric, so the search starts from the goal.
+    goal = goal if goal is not None else board.get_goal()
+
+    table = bytearray([c.UNREACHABLE] * (c.PAWN_MASK + 1))
+    table[st.encode_pos(goal)] = 0
+
+    queue : deque = deque()
+    queue.append(goal)
+
+    while queue:
+        pos : tuple[int, int] = queue.popleft()
+        dist : int = table[st.encode_pos(pos)] + 1
+
+        for direction in moves.DIRECTIONS:
+            next_pos = moves.wall_neighbor(board.topology, pos, direction)
+
+            while next_pos != (-1, -1):
+                n_cell : int = st.encode_pos(next_pos)
+
+                if table[n_cell] > dist:
+                    table[n_cell] = dist
+                    queue.append(next_pos)
+
+                next_pos = moves.wall_neighbor(board.topology, next_pos, direction)
+
+    return bytes(table)
+
+def helper_estimator(board, table : bytes):
+    # Ray bound plus one when the goal pawn cannot follow a ray-optimal route
+    # with the other pawns left where they are: reaching the goal in that many
+    # moves then needs another pawn to move first, which costs at least one move.
+    stops : dict = board.get_stop_table()
+    goal_index : int = board.get_goal_color() - 1
+
+    def reaches_alone(cells : list, dist : int) -> bool:
+        if dist == 0:
+            return True
+
+        cell : int = cells[goal_index]
+
+        for direction in moves.DIRECTIONS:
+            n_cell : int = moves.slide(stops, cells, goal_index, direction)
+
+            if table[n_cell] == dist - 1:
+                cells[goal_index] = n_cell
+                found : bool = reaches_alone(cells, dist - 1)
+                cells[goal_index] = cell
+
+                if found:
+                    return True
+
+        return False
+
+    def estimate(state : int):
+        cells : list = [st.get_cell(state, i) for i in range(c.PAWN_NUMBER)]
+        dist = table[cells[goal_index]]
+
+        if dist == 0 or dist == c.UNREACHABLE:
+            return dist
+
+        return dist if reaches_alone(cells, dist) else dist + 1
+
+    return estimate
+
+def max_estimator(estimators : list):
+    # The max of admissible bounds is still admissible
+    def estimate(state : int):
+        return max(e(state) for e in estimators)
+
+    return estimate
+
+def get_table(name : str, board) -> bytes:
+    # Tables of the board goal squares are built when the board is loaded
+    table = board.get_goal_table(name)
+
+    if table is None:
+        table = TABLES[name](board)
+
+    return table
+
+def build_goal_tables(board) -> dict:
+    tables : dict = {}
+
+    for name in sorted(TABLES):
+        for cell in goal_cells(board):
+            tables[(name, cell)] = TABLES[name](board, st.decode_pos(cell))
+
+    return tables
+
+def goal_cells(board) -> list[int]:
+    cells : list = []
+
+    for y in range(board.size):
+        for x in range(board.size):
+            if board.topology.get_goal_id(x, y) > 0:
+                cells.append(st.encode_pos((x, y)))
+
+    return sorted(cells)
+
+def save_goal_tables(board, tables : dict, filename : str) -> None:
+    # Layout hash on the first line, then every table back to back
+    with open(filename, "wb") as f:
+        f.write(board.get_layout_hash().encode("ascii") + b"\n")
+
+        for key in sorted(tables):
+            f.write(tables[key])
+
+def load_goal_tables(board, filename : str):
+    # None if the file is missing or was built for other walls
+    try:
+        with open(filename, "rb") as f:
+            header : bytes = f.readline()
+            data : bytes = f.read()
+    except IOError:
+        return None
+
+    size : int = c.PAWN_MASK + 1
+    keys : list = [(name, cell) for name in sorted(TABLES) for cell in goal_cells(board)]
+
+    if header.strip() != board.get_layout_hash().encode("ascii") or len(data) != len(keys) * size:
+        return None
+
+    return {key: data[i * size:(i + 1) * size] for i, key in enumerate(keys)}
+
+def get_goal_tables(board, filename : str) -> dict:
+    tables = load_goal_tables(board, filename)
+
+    if tables is None:
+        tables = build_goal_tables(board)
+
+        try:
+            save_goal_tables(board, tables, filename)
+        except IOError:
+            print(f"Warning: Could not write heuristic tables to {filename}")
+
+    return tables
+
+def build_estimator(name : str, board):
+    goal_index : int = board.get_goal_color() - 1
+
+    match name:
+        case "slide":
+            estimate = table_estimator(get_table("slide", board), goal_index)
+        case "ray":
+            estimate = table_estimator(get_table("ray", board), goal_index)
+        case "helper":
+            estimate = helper_estimator(board, get_table("ray", board))
+        case "pattern":
+            import patterndb
+            estimate = patterndb.pattern_estimator(board)
+        case "max":
+            estimate = max_estimator([build_estimator(n, board) for n in ADMISSIBLE])
+        case _:
+            raise ValueError(f"Unknown heuristic: {name}")
+
+    # Solvers running in other processes build the estimator again from its name
+    estimate.heuristic = name
+
+    return estimate
+
+TABLES : dict = {
+    "slide": slide_table,
+    "ray": ray_table
+}
+
+ESTIMATORS : list = ["ray", "helper", "pattern", "max", "slide"]
+ADMISSIBLE : list = ["ray", "helper", "pattern"]
+
+class CountingEstimator:
+    # Wraps an estimator to count evaluations, i.e. generated nodes
+    def __init__(self, estimator):
+        self.estimator = estimator
+        self.count : int = 0
+
+    def __call__(self, state : int):
+        self.count += 1
+        return self.estimator(state)
+
+def compare(boards : list, names : list, time_limit : float = 30.0) -> list[dict]:
+    # Solve the same deals with each estimator. Nodes pruned are counted
+    # against the first estimator of the list.
+    import astar
+
+    results : list = []
+
+    for deal, board in enumerate(boards):
+        reference = None
+
+        for name in names:
+            estimator = CountingEstimator(build_estimator(name, board))
+
+            stop_event = threading.Event()
+            timer = threading.Timer(time_limit, stop_event.set)
+            timer.start()
+            path : list = astar.astar(copy.deepcopy(board), estimator, stop_event)
+            timer.cancel()
+
+            if reference is None:
+                reference = estimator.count
+
+            results.append({
+                "deal": deal,
+                "heuristic": name,
+                "moves": len(path) - 1 if path else None,
+                "generated": estimator.count,
+                "pruned": reference - estimator.count
+            })
+
+    return results
+
+def main():
+    from board import Board
+
+    random.seed(0)
+    board = Board(c.NB_CELLS)
+    board.create_grid(c.BOARD_FILE)
+
+    # Fixed set of deals, solved by every estimator
+    boards : list = []
+    for _ in range(10):
+        board.clear()
+        board.choose_goal()
+        board.init_pawns()
+        board.save_initial_state()
+        boards.append(copy.deepcopy(board))
+
+    for r in compare(boards, ESTIMATORS):
+        print(f"deal {r['deal']:2}  {r['heuristic']:7} moves: {r['moves']}  generated: {r['generated']:8}  pruned: {r['pruned']:8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import math
+from collections import OrderedDict
+
+import consts as c
+import state as st
+import moves
+import heuristic
+
+from board import Board
+
+FOUND = -1
+CANCELLED = -2
+
+# Number of expanded nodes between two checks of the stop event
+STOP_CHECK_INTERVAL = 1024
+
+class TranspositionTable:
+    # Bounded map from a state to a learned lower bound of its remaining cost.
+    # When full, the least recently used entry is evicted.
+    def __init__(self, size : int):
+        self.size : int = size
+        self.entries : OrderedDict = OrderedDict()
+
+    def get(self, state : int, default):
+        h = self.entries.get(state)
+        if h is None:
+            return default
+
+        self.entries.move_to_end(state)
+        return h
+
+    def store(self, state : int, h) -> None:
+        self.entries[state] = h
+        self.entries.move_to_end(state)
+
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+def ida_star(board : Board, h_score, stop_event=None, table_size : int = c.IDA_TABLE_SIZE, stats=None) -> list[int]:
+    goal_cell : int = st.encode_pos(board.get_goal())
+    goal_shift : int = (board.get_goal_color() - 1) * c.PAWN_BITS
+
+    estimate = heuristic.get_estimator(h_score, board)
+    stops : dict = board.get_stop_table()
+    table = TranspositionTable(table_size)
+
+    # Current path, from the initial state to the state being searched
+    path : list = [st.read_board(board)]
+    expanded : list = [0]
+
+    get_neighbors = moves.get_neighbors
+    if stats is not None:
+        get_neighbors = stats.wrap_neighbors(get_neighbors)
+
+    def search(g : int, bound) -> int:
+        state : int = path[-1]
+
+        # The table may know a better bound than the static heuristic
+        h = estimate(state)
+        h = max(h, table.get(state, h))
+
+        f = g + h
+        if f > bound:
+            return f
+
+        if (state >> goal_shift) & c.PAWN_MASK == goal_cell:
+            return FOUND
+
+        expanded[0] += 1
+        if stop_event and expanded[0] % STOP_CHECK_INTERVAL == 0 and stop_event.is_set():
+            return CANCELLED
+
+        minimum = math.inf
+        next_states : list = get_neighbors(stops, state)
+
+        for ns in next_states:
+            path.append(ns)
+            t = search(g + 1, bound)
+
+            if t == FOUND or t == CANCELLED:
+                return t
+
+            path.pop()
+            minimum = min(minimum, t)
+
+        # Nothing below this state fits under the bound: remember how far it is
+        table.store(state, minimum - g)
+
+        return minimum
+
+    bound = estimate(path[0])
+
+    # Deepen the cost bound until the goal is reached
+    while bound < c.UNREACHABLE:
+        if stats is not None:
+            stats.f_bound = bound
+
+        t = search(0, bound)
+
+        if t == FOUND:
+            # Same order as reconstruct_path: from dest to src
+            path.reverse()
+            return path
+
+        if t == CANCELLED:
+            return []
+
+        bound = t
+
+    return []  # No path found
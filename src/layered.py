@@ -0,0 +1,152 @@
+import time
+
+import numpy as np
+
+import consts as c
+import state as st
+import moves
+import heuristic
+
+from board import Board
+
+# Breadth-first search working on whole layers at once. A layer is a sorted
+# array of packed states, and the successors of every state for one pawn and
+# one direction are computed with array operations over the stop tables.
+# States whose goal pawn cannot reach the goal within the cost bound (ray
+# table) are pruned; the bound is raised until a solution is found.
+
+def state_type():
+    # Smallest unsigned type holding a packed state. Read at each search: the
+    # geometry changes with the board file.
+    bits : int = c.PAWN_BITS * c.PAWN_NUMBER
+
+    if bits > 64:
+        raise ValueError(f"Packed states of {bits} bits do not fit in 64 bits: "
+                         f"the layered and external solvers cannot search this board")
+
+    return np.uint32 if bits <= 32 else np.uint64
+
+def build_stop_arrays(board : Board) -> dict:
+    stops : dict = board.get_stop_table()
+    return {direction: np.array(stops[direction], dtype=state_type()) for direction in moves.DIRECTIONS}
+
+def slide_layer(stops : dict, cells : list, index : int, direction : int) -> np.ndarray:
+    # Same as moves.slide, for a whole layer
+    cell : np.ndarray = cells[index]
+    stop : np.ndarray = stops[direction][cell]
+
+    for i, other in enumerate(cells):
+        if i == index:
+            continue
+
+        if direction == c.MOVE_UP:
+            same_column = (other & c.COORD_MASK) == (cell & c.COORD_MASK)
+            stop = np.where(same_column & (stop <= other) & (other < cell), np.maximum(stop, other + c.ROW_STRIDE), stop)
+        elif direction == c.MOVE_DOWN:
+            same_column = (other & c.COORD_MASK) == (cell & c.COORD_MASK)
+            stop = np.where(same_column & (cell < other) & (other <= stop), np.minimum(stop, other - c.ROW_STRIDE), stop)
+        elif direction == c.MOVE_LEFT:
+            stop = np.where((stop <= other) & (other < cell), np.maximum(stop, other + 1), stop)
+        elif direction == c.MOVE_RIGHT:
+            stop = np.where((cell < other) & (other <= stop), np.minimum(stop, other - 1), stop)
+
+    return stop
+
+def expand_layer(stops : dict, layer : np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Successors of every state of the layer, with the state they come from
+    cells : list = [(layer >> (i * c.PAWN_BITS)) & c.PAWN_MASK for i in range(c.PAWN_NUMBER)]
+    successors : list = []
+    parents : list = []
+    all_bits : int = (1 << (8 * layer.dtype.itemsize)) - 1
+
+    for index in range(c.PAWN_NUMBER):
+        shift : int = index * c.PAWN_BITS
+        cleared : np.ndarray = layer & layer.dtype.type(~(c.PAWN_MASK << shift) & all_bits)
+
+        for direction in moves.DIRECTIONS:
+            destination : np.ndarray = slide_layer(stops, cells, index, direction)
+            moved : np.ndarray = destination != cells[index]
+
+            successors.append(cleared[moved] | (destination[moved] << shift))
+            parents.append(layer[moved])
+
+    return np.concatenate(successors), np.concatenate(parents)
+
+def reconstruct_path(layers : list, parents : list, state : int) -> list[int]:
+    # Same order as astar.reconstruct_path: from dest to src
+    path : list = [state]
+
+    for depth in range(len(layers) - 1, 0, -1):
+        index : int = int(np.searchsorted(layers[depth], state))
+        state = int(parents[depth][index])
+        path.append(state)
+
+    return path
+
+def layered(board : Board, h_score, stop_event=None, stats=None) -> list[int]:
+    # h_score is only accepted for the common solver interface: pruning needs a
+    # table indexed by cell, so the admissible ray table is used instead
+    goal_cell : int = st.encode_pos(board.get_goal())
+    goal_shift : int = (board.get_goal_color() - 1) * c.PAWN_BITS
+
+    stops : dict = build_stop_arrays(board)
+    ray : np.ndarray = np.frombuffer(heuristic.get_table("ray", board), dtype=np.uint8)
+
+    start : int = st.read_board(board)
+    bound : int = int(ray[(start >> goal_shift) & c.PAWN_MASK])
+
+    while bound < c.UNREACHABLE:
+        if stats is not None:
+            stats.f_bound = bound
+
+        layers : list = [np.array([start], dtype=state_type())]
+        parents : list = [np.array([start], dtype=state_type())]
+        visited : np.ndarray = layers[0]
+        pruned : bool = False
+
+        for depth in range(bound + 1):
+            layer : np.ndarray = layers[-1]
+
+            # Goal reached in this layer
+            found : np.ndarray = layer[((layer >> goal_shift) & c.PAWN_MASK) == goal_cell]
+            if len(found):
+                return reconstruct_path(layers, parents, int(found[0]))
+
+            if depth == bound or len(layer) == 0:
+                break
+
+            if stop_event and stop_event.is_set():
+                return []
+
+            expand_start : float = time.perf_counter()
+            successors, origins = expand_layer(stops, layer)
+
+            # Remove duplicates, keeping one parent per state, then states already seen
+            successors, first = np.unique(successors, return_index=True)
+            origins = origins[first]
+
+            new : np.ndarray = ~np.isin(successors, visited, assume_unique=True)
+            successors, origins = successors[new], origins[new]
+
+            # Keep the states whose goal pawn can still reach the goal within the bound
+            h : np.ndarray = ray[(successors >> goal_shift) & c.PAWN_MASK]
+            keep : np.ndarray = h.astype(np.int32) + depth + 1 <= bound
+            pruned = pruned or not keep.all()
+
+            # Pruned states are still marked as seen: they would be pruned again deeper
+            visited = np.union1d(visited, successors)
+            layers.append(successors[keep])
+            parents.append(origins[keep])
+
+            if stats is not None:
+                stats.expanded += len(layer)
+                stats.generated += len(successors)
+                stats.neighbor_time += time.perf_counter() - expand_start
+                stats.open_high_water = max(stats.open_high_water, len(layers[-1]))
+
+        if not pruned:
+            break  # Whole reachable space searched
+
+        bound += 1
+
+    return []  # No path found
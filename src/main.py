@@ -1,84 +1,90 @@
 #!/usr/bin/env python3
 from collections import deque
-import math, copy, threading, concurrent.futures
 
 import pygame as pg
 
 import consts as c
-import astar
+import state as st
+import render
+import stats
 
+from batch import draw_deal, setup_deal
 from board import Board
+from cache import Cache, deal_key
 from player import Player
+from speculate import Speculator, DONE
     
-def run(window : pg.Surface):
+def run(window : pg.Surface, board : Board):
     # Initialize clock and timer event
     TIMER_EVENT = pg.USEREVENT
+
+    # Events posted when the solver processes report
+    SOLVER_DONE_EVENT = pg.USEREVENT + 1
+    SOLVER_PROGRESS_EVENT = pg.USEREVENT + 2
     clock = pg.time.Clock()
     
-    # Initialize board
-    board = Board(c.NB_CELLS)
-    board.create_grid("src/board.txt")
-    
     # Initialize player
     player = Player()
 
-    # Initialize font
+    # Initialize font, text and board rendering caches
     font = pg.font.SysFont('Consolas', 18)
+    texts = render.TextCache(font)
+    renderer = render.BoardRenderer(board)
+    gui_rect = pg.Rect(0, c.WINDOW_SIZE, c.WINDOW_SIZE, c.WINDOW_GUI_HEIGHT)
+    gui_key : tuple = None
 
     # Game state variables
     running : bool = True
     game_state : int = c.STATE_INITIALIZING
     timer : int = -1
     solution_found : bool = False
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-    ai_future = None
-    ai_cancel = threading.Event()
-    ai_board : Board = None
     ai_score : int = 0
     ai_moves : int = 0
     ai_move_sequence : list = []
     ai_move_timer : int = 0
-    heuristic : dict = {} 
-    gui_args : list = [-1, False, 0, 0] # 0: remaining time, 1: solution found flag, 2: AI score, 3: AI moves
+    ai_progress : tuple = (0, 0) # Nodes expanded and f bound reached by the solver
+    ai_gave_up : bool = False
+    ai_best : tuple = None # Moves and suboptimality bound of the best path found so far
+    ai_key : str = ""
+    solution_cache = Cache(c.CACHE_FILE, "solutions")
+
+    # Deals are drawn and solved in background processes ahead of time
+    speculator = Speculator(c.BOARD_FILE, c.SOLVER)
+    prepared_deals : deque = deque() # (key, goal, packed pawns) of the next deals
+    gui_args : list = [-1, False, 0, 0, (0, 0), False, None] # 0: remaining time, 1: solution found flag, 2: AI score, 3: AI moves, 4: AI progress, 5: AI gave up flag, 6: AI best path so far
 
     # Game loop
     while running:
+        # Forward the solver reports to the event queue
+        for kind, key, _ in speculator.poll():
+            pg.event.post(pg.event.Event(SOLVER_DONE_EVENT if kind == DONE else SOLVER_PROGRESS_EVENT, key=key))
+
         # Update game logic here
         match game_state:
             case c.STATE_INITIALIZING:
                 player.reset()
 
-                board.clear()
-                board.choose_goal()
+                # Keep PREPARED_DEALS deals ahead, each one sent to the solver when drawn
+                speculator.forget(ai_key)
 
-                # Calc heuristic here
-                goal_pos = board.get_goal()
-                heuristic  = {(x, y): math.inf for x in range(c.NB_CELLS) for y in range(c.NB_CELLS)} # Dummy initial value
-                heuristic[goal_pos] = 0
+                while len(prepared_deals) <= c.PREPARED_DEALS:
+                    goal, state = draw_deal(board)
+                    key : str = deal_key(board, state)
+                    prepared_deals.append((key, goal, state))
 
-                queue : deque = deque()
-                queue.append(goal_pos)
+                    if solution_cache.get(key) is None:
+                        speculator.submit(key, goal, state)
 
-                while queue:
-                    x, y = queue.popleft()
-
-                    for direction in [c.MOVE_UP, c.MOVE_DOWN, c.MOVE_LEFT, c.MOVE_RIGHT]:
-
-                        n_x, n_y = board.simulate_move((x, y), direction)
-
-                        if (n_x, n_y) != (-1, -1):
-                            if heuristic[(n_x, n_y)] > heuristic[(x, y)] + 1:
-                                heuristic[(n_x, n_y)] = heuristic[(x, y)] + 1
-                                queue.append((n_x, n_y))
-
-                board.init_pawns()
-                board.save_initial_state()
+                ai_key, goal, state = prepared_deals.popleft()
+                setup_deal(board, goal, state)
 
                 timer = c.DECISION_TIME
                 solution_found = False
                 ai_move_sequence = []
                 ai_moves = 0
                 ai_move_timer = 0
+                ai_gave_up = False
+                ai_best = None
 
                 game_state = c.STATE_PLAYER_TURN
             case c.STATE_PLAYER_TURN:
@@ -111,30 +117,97 @@ def run(window : pg.Surface):
 
                             board.load_initial_state()
 
-                            ai_cancel.clear()
-                            ai_board = copy.deepcopy(board)
-                            ai_future = executor.submit(astar.astar, ai_board, heuristic, ai_cancel)
-
                             timer = c.DECISION_TIME
                             solution_found = False
 
-                            game_state = c.STATE_COMPUTER_CALCULATING
+                            # Deals already solved are replayed at once
+                            cached : list = solution_cache.get(ai_key)
+                            searched : bool = cached is None and speculator.has_result(ai_key)
+
+                            if searched:
+                                progress : dict = speculator.get_progress(ai_key)
+                                ai_progress = (progress.get("expanded", 0), progress.get("f_bound", 0))
+
+                                optimal : bool = speculator.is_optimal(ai_key)
+                                cached = speculator.pop_result(ai_key)
+
+                                if cached and optimal:
+                                    solution_cache.put(ai_key, list(cached))
+
+                            if cached:
+                                ai_move_sequence = list(cached)
+                                ai_moves = len(ai_move_sequence) - 1
+                                game_state = c.STATE_COMPUTER_TURN
+                            elif searched:
+                                # The search is over without a path
+                                ai_gave_up = True
+
+                                game_state = c.STATE_RESULTS
+                                if player.get_move_count() > 0:
+                                    player.increment_win_count()
+                            else:
+                                # Still searching: wait for it, at most DECISION_TIME
+                                speculator.start_clock(ai_key)
+                                progress : dict = speculator.get_progress(ai_key)
+                                ai_progress = (progress.get("expanded", 0), progress.get("f_bound", 0))
+
+                                if progress.get("best_moves") is not None:
+                                    ai_best = (progress["best_moves"], progress["suboptimality"])
+
+                                game_state = c.STATE_COMPUTER_CALCULATING
             case c.STATE_COMPUTER_CALCULATING:
                 for event in pg.event.get():
                     if event.type == pg.QUIT:
                         running = False
-                    elif event.type == TIMER_EVENT:
+                    elif event.type == SOLVER_PROGRESS_EVENT and event.key == ai_key:
+                        progress : dict = speculator.get_progress(ai_key)
+                        ai_progress = (progress.get("expanded", 0), progress.get("f_bound", 0))
+
+                        if progress.get("best_moves") is not None:
+                            ai_best = (progress["best_moves"], progress["suboptimality"])
+                    elif event.type == SOLVER_DONE_EVENT and event.key == ai_key:
+                        progress : dict = speculator.get_progress(ai_key)
+                        ai_progress = (progress.get("expanded", 0), progress.get("f_bound", 0))
+
+                        optimal : bool = speculator.is_optimal(ai_key)
+                        ai_move_sequence = list(speculator.pop_result(ai_key))
+
+                        if not ai_move_sequence:
+                            # The search is over without a path, or ran out of time
+                            ai_gave_up = True
+                            stats.export({"event": "timeout", "deal": ai_key, "stats": progress})
+
+                            game_state = c.STATE_RESULTS
+                            if player.get_move_count() > 0:
+                                player.increment_win_count()
+                        else:
+                            ai_moves = len(ai_move_sequence) - 1
+
+                            if optimal:
+                                solution_cache.put(ai_key, list(ai_move_sequence))
+
+                            game_state = c.STATE_COMPUTER_TURN
+                    elif event.type == TIMER_EVENT and game_state == c.STATE_COMPUTER_CALCULATING:
                         if timer > 0:
                             timer -= 1
+                        elif speculator.get_best(ai_key):
+                            # Time is up: play the best path found so far, without caching it
+                            ai_move_sequence = list(speculator.get_best(ai_key))
+                            ai_moves = len(ai_move_sequence) - 1
+                            stats.export({"event": "deadline", "deal": ai_key, "stats": speculator.get_progress(ai_key)})
 
-                            if ai_future is not None and ai_future.done():
-                                ai_move_sequence = ai_future.result()  # result is safe to use in main thread
-                                ai_moves = len(ai_move_sequence) - 1
-                                ai_future = None
-                                game_state = c.STATE_COMPUTER_TURN
+                            speculator.forget(ai_key)
+
+                            game_state = c.STATE_COMPUTER_TURN
                         else:
-                            ai_cancel.set()
-                            ai_future.cancel()
+                            # No solution is shorter than the f bound reached so far.
+                            # Forgetting the deal stops its search.
+                            progress : dict = speculator.get_progress(ai_key)
+                            ai_progress = (progress.get("expanded", 0), progress.get("f_bound", 0))
+                            ai_gave_up = True
+                            stats.export({"event": "timeout", "deal": ai_key, "stats": progress})
+
+                            speculator.forget(ai_key)
 
                             game_state = c.STATE_RESULTS # No solution found within time
                             if player.get_move_count() > 0:
@@ -149,13 +222,8 @@ def run(window : pg.Surface):
                 if len(ai_move_sequence) > 0:
                     if current_time - ai_move_timer >= 2000: # 2 seconds per move
                         ai_move_timer = current_time
-                        board.clear_pawns()
-
-                        state : tuple = ai_move_sequence.pop()
-
-                        for i in range(c.PAWN_NUMBER):
-                            x, y = state[i]
-                            board.set_cell_value(x, y, i + 1)
+                        state : int = ai_move_sequence.pop()
+                        st.write_board(board, state)
                 else:
                     # If AI found a better path, or player did not find any solution then AI scores
                     if player.get_move_count() == 0 or ai_moves < player.get_move_count():
@@ -182,99 +250,127 @@ def run(window : pg.Surface):
         gui_args[1] = solution_found
         gui_args[2] = ai_score
         gui_args[3] = ai_moves
+        gui_args[4] = ai_progress
+        gui_args[5] = ai_gave_up
+        gui_args[6] = ai_best
+
+        # Rendering and Updating display: only the areas that changed
+        dirty : list = renderer.draw(window)
 
-         # Rendering and Updating display
-        window.fill(c.BLACK) # Clear the window with black color
+        key : tuple = (game_state, tuple(gui_args), player.get_move_count(), player.get_chosen_pawn(), player.get_win_count())
+        if key != gui_key:
+            gui_key = key
 
-        board.draw(window)
+            window.fill(c.BLACK, gui_rect) # Clear the GUI area with black color
+            render_gui(window, texts, game_state, player, gui_args)
+            dirty.append(gui_rect)
 
-        render_gui(window, font, game_state, player, gui_args)
+        if dirty:
+            pg.display.update(dirty)
 
-        pg.display.flip()
+        # Nothing changed: idle at a lower frame rate
+        clock.tick(c.FPS if dirty else c.IDLE_FPS)
 
-        # Sleep to maintain 60 FPS
-        clock.tick(60)
+    # Stop the searches still running so the program can exit
+    speculator.close()
 
-def render_gui(window: pg.Surface, font: pg.font.Font, game_state: int, player: Player, args: list) -> None:
+    solution_cache.close()
+
+def render_gui(window: pg.Surface, texts: render.TextCache, game_state: int, player: Player, args: list) -> None:
     # Unpack arguments
     remaining_time : int = args[0]
     solution_found : bool = args[1]
     ai_score : int = args[2]
     ai_moves: int = args[3]
+    ai_expanded, ai_bound = args[4]
+    ai_gave_up : bool = args[5]
+    ai_best : tuple = args[6]
 
     # Render GUI based on game state
     match game_state:
         case c.STATE_INITIALIZING:
-            info_text = font.render("Initializing...", False, c.WHITE)
+            info_text = texts.render("Initializing...")
             window.blit(info_text, (10, c.WINDOW_SIZE + 10))
         case c.STATE_PLAYER_TURN:
             move_count : int = player.get_move_count()
             chosen_pawn : int = player.get_chosen_pawn()
             win_count : int = player.get_win_count()
 
-            info_text = font.render("Player's turn!", False, c.WHITE)
+            info_text = texts.render("Player's turn!")
             window.blit(info_text, (10, c.WINDOW_SIZE + 10))
 
-            timer_text = font.render(f"Time left: {remaining_time} s", False, c.WHITE)
+            timer_text = texts.render(f"Time left: {remaining_time} s")
             window.blit(timer_text, (400, c.WINDOW_SIZE + 10))
 
-            move_text = font.render(f"Moves made: {move_count}", False, c.WHITE)
+            move_text = texts.render(f"Moves made: {move_count}")
             window.blit(move_text, (10, c.WINDOW_SIZE + 40))
 
-            pawn_text = font.render("Chosen pawn: " + c.COLOR_NAME_MAP[c.PAWN_COLORS[chosen_pawn]], False, c.WHITE)
+            pawn_text = texts.render("Chosen pawn: " + c.COLOR_NAME_MAP[c.PAWN_COLORS[chosen_pawn]])
             window.blit(pawn_text, (200, c.WINDOW_SIZE + 40))
 
-            wins_text = font.render(f"Score: {win_count}", False, c.WHITE)
+            wins_text = texts.render(f"Score: {win_count}")
             window.blit(wins_text, (400, c.WINDOW_SIZE + 40))
 
-            cmd_text = font.render("Arrows: Move   Tab: Change pawn   Esc: Return to initial state", False, c.WHITE)
+            cmd_text = texts.render("Arrows: Move   Tab: Change pawn   Esc: Return to initial state")
             window.blit(cmd_text, (10, c.WINDOW_SIZE + 100))
         case c.STATE_PLAYER_END:
             move_count : int = player.get_move_count()
 
-            info_text = font.render("Time is up!", False, c.WHITE)
+            info_text = texts.render("Time is up!")
             window.blit(info_text, (10, c.WINDOW_SIZE + 10))
 
             text : str = f"You did not find a solution in time. Total moves: {move_count}."
             if solution_found:
                 text = f"You found a solution in {move_count} moves."
 
-            move_text = font.render(text, False, c.WHITE)
+            move_text = texts.render(text)
             window.blit(move_text, (10, c.WINDOW_SIZE + 40))
 
-            prompt_text = font.render("Press ENTER to continue.", False, c.WHITE)
+            prompt_text = texts.render("Press ENTER to continue.")
             window.blit(prompt_text, (10, c.WINDOW_SIZE + 70))
         case c.STATE_COMPUTER_CALCULATING:
-            info_text = font.render("Computing best path...", False, c.WHITE)
+            info_text = texts.render("Computing best path...")
             window.blit(info_text, (10, c.WINDOW_SIZE + 10))
 
-            timer_text = font.render(f"Time left: {remaining_time} s", False, c.WHITE)
+            timer_text = texts.render(f"Time left: {remaining_time} s")
             window.blit(timer_text, (400, c.WINDOW_SIZE + 10))
+
+            progress_text = texts.render(f"Nodes expanded: {ai_expanded}   Depth bound: {ai_bound}")
+            window.blit(progress_text, (10, c.WINDOW_SIZE + 40))
+
+            if ai_best is not None:
+                best_moves, suboptimality = ai_best
+                best_text = texts.render(f"Best so far: {best_moves} moves (at most x{suboptimality:g} the optimal)")
+                window.blit(best_text, (10, c.WINDOW_SIZE + 70))
         case c.STATE_COMPUTER_TURN:
-            info_text = font.render("Computer's turn!", False, c.WHITE)
+            info_text = texts.render("Computer's turn!")
             window.blit(info_text, (10, c.WINDOW_SIZE + 10))
 
-            score_text = font.render(f"AI Score: {ai_score}", False, c.WHITE)
+            score_text = texts.render(f"AI Score: {ai_score}")
             window.blit(score_text, (400, c.WINDOW_SIZE + 10))
 
-            move_text = font.render(f"Moves made: {ai_moves}", False, c.WHITE)
+            move_text = texts.render(f"Moves made: {ai_moves}")
             window.blit(move_text, (10, c.WINDOW_SIZE + 40))
         case c.STATE_RESULTS:
-            info_text = font.render("Results:", False, c.WHITE)
+            info_text = texts.render("Results:")
             window.blit(info_text, (10, c.WINDOW_SIZE + 10))
 
             win_count : int = player.get_win_count()
 
-            wins_text = font.render(f"Score: {win_count}", False, c.WHITE)
+            wins_text = texts.render(f"Score: {win_count}")
             window.blit(wins_text, (200, c.WINDOW_SIZE + 40))
 
-            score_text = font.render(f"AI Score: {ai_score}", False, c.WHITE)
+            score_text = texts.render(f"AI Score: {ai_score}")
             window.blit(score_text, (200, c.WINDOW_SIZE + 70))
 
-            prompt_text = font.render("Press ENTER to continue.", False, c.WHITE)
+            if ai_gave_up:
+                bound_text = texts.render(f"Computer gave up: no solution shorter than {ai_bound} moves.")
+                window.blit(bound_text, (10, c.WINDOW_SIZE + 130))
+
+            prompt_text = texts.render("Press ENTER to continue.")
             window.blit(prompt_text, (10, c.WINDOW_SIZE + 100))
         case _:
-            info_text = font.render("Unknown game state!", False, c.WHITE)
+            info_text = texts.render("Unknown game state!")
             window.blit(info_text, (10, c.WINDOW_SIZE + 10))
         
 def close_game():
@@ -292,9 +388,13 @@ def init():
     return window
 
 def main():
+    # The board file sets the board size, hence the window size
+    board = Board(c.NB_CELLS)
+    board.create_grid(c.BOARD_FILE)
+
     window = init()
 
-    run(window)
+    run(window, board)
 
     close_game()
 
@@ -0,0 +1,125 @@
+import consts as c
+import state as st
+
+DIRECTIONS : list = [c.MOVE_UP, c.MOVE_DOWN, c.MOVE_LEFT, c.MOVE_RIGHT]
+
+OPPOSITE : dict = {
+    c.MOVE_UP: c.MOVE_DOWN,
+    c.MOVE_DOWN: c.MOVE_UP,
+    c.MOVE_LEFT: c.MOVE_RIGHT,
+    c.MOVE_RIGHT: c.MOVE_LEFT
+}
+
+def build_stop_table(topology) -> dict:
+    # For each direction and packed cell, the square where a pawn stops
+    # when only walls are taken into account (the cell itself if it cannot move)
+    stops : dict = {}
+
+    for direction in DIRECTIONS:
+        table : list = [0] * (c.PAWN_MASK + 1)
+
+        for y in range(topology.size):
+            for x in range(topology.size):
+                tmp = (x, y)
+                next_cell = wall_neighbor(topology, tmp, direction)
+
+                while next_cell != (-1, -1):
+                    tmp = next_cell
+                    next_cell = wall_neighbor(topology, tmp, direction)
+
+                table[st.encode_pos((x, y))] = st.encode_pos(tmp)
+
+        stops[direction] = table
+
+    return stops
+
+def build_step_table(topology) -> dict:
+    # For each direction and packed cell, the next square if no wall is in
+    # the way (the cell itself otherwise)
+    steps : dict = {}
+
+    for direction in DIRECTIONS:
+        table : list = [0] * (c.PAWN_MASK + 1)
+
+        for y in range(topology.size):
+            for x in range(topology.size):
+                next_cell = wall_neighbor(topology, (x, y), direction)
+
+                if next_cell == (-1, -1):
+                    next_cell = (x, y)
+
+                table[st.encode_pos((x, y))] = st.encode_pos(next_cell)
+
+        steps[direction] = table
+
+    return steps
+
+def wall_neighbor(topology, current : tuple[int, int], direction : int) -> tuple[int, int]:
+    # Same rules as Board.get_neighbor, without looking at the pawns
+    x, y = current
+    size = topology.size
+    walls = topology.walls
+    index = y * size + x
+
+    if direction == c.MOVE_UP:
+        if y > 0 and not walls[index] & c.COL_UP and not walls[index - size] & c.COL_DOWN:
+            return (x, y - 1)
+
+    if direction == c.MOVE_DOWN:
+        if y < size - 1 and not walls[index] & c.COL_DOWN and not walls[index + size] & c.COL_UP:
+            return (x, y + 1)
+
+    if direction == c.MOVE_LEFT:
+        if x > 0 and not walls[index] & c.COL_LEFT and not walls[index - 1] & c.COL_RIGHT:
+            return (x - 1, y)
+
+    if direction == c.MOVE_RIGHT:
+        if x < size - 1 and not walls[index] & c.COL_RIGHT and not walls[index + 1] & c.COL_LEFT:
+            return (x + 1, y)
+
+    return (-1, -1)
+
+def slide(stops : dict, cells : list, index : int, direction : int) -> int:
+    # Destination of pawn `index` given the packed cells of every pawn
+    cell : int = cells[index]
+    stop : int = stops[direction][cell]
+
+    if stop == cell:
+        return cell
+
+    # Clip the wall stop against the pawns lying on the way
+    for i, other in enumerate(cells):
+        if i == index:
+            continue
+
+        if direction == c.MOVE_UP:
+            if stop <= other < cell and (other & c.COORD_MASK) == (cell & c.COORD_MASK):
+                stop = other + c.ROW_STRIDE
+        elif direction == c.MOVE_DOWN:
+            if cell < other <= stop and (other & c.COORD_MASK) == (cell & c.COORD_MASK):
+                stop = other - c.ROW_STRIDE
+        elif direction == c.MOVE_LEFT:
+            if stop <= other < cell:
+                stop = other + 1
+        elif direction == c.MOVE_RIGHT:
+            if cell < other <= stop:
+                stop = other - 1
+
+    return stop
+
+def get_neighbors(stops : dict, state : int) -> list[int]:
+    neighbors : list = []
+    cells : list = [st.get_cell(state, i) for i in range(c.PAWN_NUMBER)]
+
+    # For each pawn, try each possible move
+    for index in range(c.PAWN_NUMBER):
+        cell : int = cells[index]
+
+        for direction in DIRECTIONS:
+            destination : int = slide(stops, cells, index, direction)
+
+            # Record the new state if the pawn moved
+            if destination != cell:
+                neighbors.append(st.set_cell(state, index, destination))
+
+    return neighbors
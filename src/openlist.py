@@ -0,0 +1,122 @@
+import heapq
+from collections import deque
+
+# Open lists used by the solvers. Both keep the f value of the live entry of each
+# state in a dict: pushing a state again (better path found) simply adds a new
+# entry, and outdated entries are skipped when they come out of the queue.
+
+class HeapOpenList:
+    def __init__(self):
+        self.heap : list = []
+        self.entries : dict = {} # state -> f of its live entry
+        self.stale : int = 0     # Outdated entries dropped so far
+
+    def push(self, f, state : int) -> None:
+        self.entries[state] = f
+        heapq.heappush(self.heap, (f, state))
+
+    def pop(self) -> int:
+        while self.heap:
+            f, state = heapq.heappop(self.heap)
+
+            # Skip entries replaced by a better push
+            if self.entries.get(state) == f:
+                del self.entries[state]
+                return state
+
+            self.stale += 1
+
+        raise IndexError("pop from an empty open list")
+
+    def peek_f(self):
+        # Lowest f among live entries (drops outdated entries on the way)
+        while self.heap:
+            f, state = self.heap[0]
+            if self.entries.get(state) == f:
+                return f
+
+            heapq.heappop(self.heap)
+            self.stale += 1
+
+        raise IndexError("peek from an empty open list")
+
+    def __contains__(self, state : int) -> bool:
+        return state in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class BucketOpenList:
+    # f values are small integers (a few dozen moves at most), so states are kept
+    # in one bucket per f value. Values past the last bucket (including infinity)
+    # share the last one, which is served first in, first out.
+    def __init__(self, max_f : int = 256):
+        self.buckets : list = [deque() for _ in range(max_f + 1)]
+        self.entries : dict = {} # state -> f of its live entry
+        self.stale : int = 0     # Outdated entries dropped so far
+        self.min_f : int = max_f + 1
+
+    def push(self, f, state : int) -> None:
+        index : int = min(f, len(self.buckets) - 1)
+
+        self.entries[state] = f
+        self.buckets[index].append(state)
+
+        if index < self.min_f:
+            self.min_f = index
+
+    def pop(self) -> int:
+        while self.min_f < len(self.buckets):
+            bucket : deque = self.buckets[self.min_f]
+            overflow : bool = self.min_f == len(self.buckets) - 1
+
+            # Last in, first out: deeper states of the same f come out first
+            while bucket:
+                state : int = bucket.popleft() if overflow else bucket.pop()
+
+                # Skip entries replaced by a better push
+                if self.is_live(state):
+                    del self.entries[state]
+                    return state
+
+                self.stale += 1
+
+            self.min_f += 1
+
+        raise IndexError("pop from an empty open list")
+
+    def peek_f(self):
+        while self.min_f < len(self.buckets):
+            bucket : deque = self.buckets[self.min_f]
+            overflow : bool = self.min_f == len(self.buckets) - 1
+
+            while bucket:
+                state : int = bucket[0] if overflow else bucket[-1]
+                if self.is_live(state):
+                    return self.entries[state]
+
+                if overflow:
+                    bucket.popleft()
+                else:
+                    bucket.pop()
+                self.stale += 1
+
+            self.min_f += 1
+
+        raise IndexError("peek from an empty open list")
+
+    def is_live(self, state : int) -> bool:
+        # An entry is live if the state's current f falls in the bucket being served
+        f = self.entries.get(state)
+        return f is not None and min(f, len(self.buckets) - 1) == self.min_f
+
+    def __contains__(self, state : int) -> bool:
+        return state in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+OPEN_LISTS : dict = {
+    "heap": HeapOpenList,
+    "bucket": BucketOpenList
+}
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import argparse, mmap, os, sys, tempfile, time
+
+import numpy as np
+
+import consts as c
+import state as st
+import moves
+
+from board import Board
+
+# Pattern database: for every goal square, the moves needed to bring the goal
+# pawn there when only one other pawn (the helper) is on the board, for every
+# position of both pawns. Tables are indexed by goal pawn cell * cells + helper
+# cell, one uint8 per entry (c.UNREACHABLE if the goal cannot be reached).
+#
+# The pawns left out may stop a slide anywhere, so in the abstract problem a
+# pawn may stop on any square of its slide before a wall or the other pawn.
+# Every real move is then an abstract move (or no move at all when a pawn left
+# out moves), and the table never overestimates. Each helper gives a bound,
+# and the estimator keeps the largest one.
+#
+# Stopping anywhere on a slide can be undone, so the search of the moves left
+# runs forward from the goal. Tables are built once per board layout, saved
+# next to the board file and memory-mapped read-only: every process solving
+# on the board shares the same pages.
+
+def build_table(topology, steps : dict, goal_cell : int) -> np.ndarray:
+    cells : int = c.PAWN_MASK + 1
+    table : np.ndarray = np.full(cells * cells, c.UNREACHABLE, dtype=np.uint8)
+
+    # Goal pawn on the goal square, helper anywhere else on the board
+    helpers : np.ndarray = np.array([st.encode_pos((x, y)) for y in range(topology.size) for x in range(topology.size)])
+    helpers = helpers[helpers != goal_cell]
+    pawns : np.ndarray = np.full(len(helpers), goal_cell)
+    table[pawns * cells + helpers] = 0
+
+    for dist in range(1, c.UNREACHABLE):
+        reached : list = []
+
+        # Both pawns, every direction, every square of the slide
+        for mover, other in ((pawns, helpers), (helpers, pawns)):
+            for direction in moves.DIRECTIONS:
+                pos : np.ndarray = mover
+                moving : np.ndarray = np.ones(len(pos), dtype=bool)
+
+                while True:
+                    next_pos : np.ndarray = steps[direction][pos]
+                    moving &= (next_pos != pos) & (next_pos != other)
+
+                    if not moving.any():
+                        break
+
+                    pos = np.where(moving, next_pos, pos)
+
+                    if mover is pawns:
+                        reached.append(pos[moving] * cells + other[moving])
+                    else:
+                        reached.append(other[moving] * cells + pos[moving])
+
+        if not reached:
+            break
+
+        indices : np.ndarray = np.concatenate(reached)
+        indices = indices[table[indices] == c.UNREACHABLE]
+
+        if len(indices) == 0:
+            break
+
+        # Marking the table removes the duplicates, cheaper than sorting them out
+        table[indices] = dist
+        indices = np.flatnonzero(table == dist)
+        pawns, helpers = indices // cells, indices % cells
+
+    return table
+
+def goal_cells(topology) -> list[int]:
+    return sorted(st.encode_pos(pos) for squares in topology.goals.values() for pos in squares)
+
+def build_tables(topology) -> dict:
+    steps : dict = {direction: np.array(table) for direction, table in moves.build_step_table(topology).items()}
+
+    return {cell: build_table(topology, steps, cell) for cell in goal_cells(topology)}
+
+def save_tables(topology, tables : dict, filename : str) -> None:
+    # Layout hash on the first line, then every table back to back. Written to a
+    # temporary file then renamed over the old one: processes mapping the old
+    # file keep reading it whole, and processes building at the same time do
+    # not mix their writes.
+    f = tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(filename)), suffix=c.PATTERN_DB_EXT, delete=False)
+
+    try:
+        with f:
+            f.write(topology.layout_hash.encode("ascii") + b"\n")
+
+            for cell in sorted(tables):
+                f.write(tables[cell].tobytes())
+
+        # Readable by all, as a file opened for writing would be
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, filename)
+    except BaseException:
+        os.remove(f.name)
+        raise
+
+def load_tables(topology, filename : str):
+    # None if the file is missing or was built for other walls
+    try:
+        with open(filename, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, ValueError):
+        return None
+
+    header : bytes = topology.layout_hash.encode("ascii") + b"\n"
+    size : int = (c.PAWN_MASK + 1) ** 2
+    cells : list = goal_cells(topology)
+
+    if data[:len(header)] != header or len(data) != len(header) + len(cells) * size:
+        data.close()
+        return None
+
+    # Views on the mapped file, nothing is copied
+    view = memoryview(data)
+    return {cell: view[len(header) + i * size:len(header) + (i + 1) * size] for i, cell in enumerate(cells)}
+
+def get_tables(board : Board) -> dict:
+    topology = board.topology
+
+    if topology.pattern_tables is None:
+        tables = load_tables(topology, topology.pattern_file)
+
+        if tables is None:
+            try:
+                save_tables(topology, build_tables(topology), topology.pattern_file)
+                tables = load_tables(topology, topology.pattern_file)
+            except IOError:
+                print(f"Warning: Could not write pattern database to {topology.pattern_file}")
+
+        # Unwritable directory: keep the tables in memory
+        if tables is None:
+            tables = {cell: memoryview(table.tobytes()) for cell, table in build_tables(topology).items()}
+
+        topology.pattern_tables = tables
+
+    return topology.pattern_tables
+
+def pattern_estimator(board : Board):
+    table = get_tables(board)[st.encode_pos(board.get_goal())]
+    cells : int = c.PAWN_MASK + 1
+
+    goal_index : int = board.get_goal_color() - 1
+    goal_shift : int = goal_index * c.PAWN_BITS
+    helper_shifts : list = [i * c.PAWN_BITS for i in range(c.PAWN_NUMBER) if i != goal_index]
+
+    def estimate(state : int):
+        row : int = ((state >> goal_shift) & c.PAWN_MASK) * cells
+        return max(table[row + ((state >> shift) & c.PAWN_MASK)] for shift in helper_shifts)
+
+    return estimate
+
+def main(argv : list = None):
+    parser = argparse.ArgumentParser(description="Build the pattern database of a board.")
+    parser.add_argument("--board", default=c.BOARD_FILE, help="board file")
+    args = parser.parse_args(argv)
+
+    board = Board(c.NB_CELLS)
+    board.create_grid(args.board)
+
+    start : float = time.perf_counter()
+    tables : dict = build_tables(board.topology)
+    save_tables(board.topology, tables, board.topology.pattern_file)
+
+    size : int = sum(len(table) for table in tables.values())
+    sys.stdout.write(f"{len(tables)} goal tables, {size} bytes, built in {time.perf_counter() - start:.1f} s: {board.topology.pattern_file}\n")
+
+if __name__ == "__main__":
+    main()
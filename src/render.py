@@ -0,0 +1,157 @@
+import pygame as pg
+
+import consts as c
+from board import Board
+from cell import Cell
+
+# Drawing is kept out of Board and Cell so the solver can run without pygame
+
+def draw_board(window : pg.Surface, board : Board) -> None:
+    # Draw all cells
+    for y in range(board.size):
+        for x in range(board.size):
+            draw_cell(window, board.get_cell(x, y), x, y)
+
+def draw_cell(window : pg.Surface, cell : Cell, x : int, y : int, with_pawn : bool = True) -> None:
+    # Cell size in pixels
+    size : int = c.CELL_SIZE
+    center_x : int = int(round(size * (x + 0.5)))
+    center_y : int = int(round(size * (y + 0.5)))
+
+    # Retrieve collision info
+    left : bool = cell.collide_left
+    right : bool = cell.collide_right
+    up : bool = cell.collide_up
+    down : bool = cell.collide_down
+
+    # Retrieve proper cell/pawn color
+    col : tuple[int, int, int] = c.WHITE
+
+    if cell.goal_pawn_id > 0:
+        col = c.PAWN_COLORS[cell.goal_pawn_id]
+
+    # Draw cell
+    pg.draw.rect(window, c.BLACK, (x * size, y * size, size, size))
+    pg.draw.rect(window, col, (x * size + 1 + 2 * left, y * size + 1 + 2 * up, size - 1 - 2 * right, size - 1 - 2 * down))
+
+    # Draw pawn if present
+    if with_pawn and cell.value > 0:
+        draw_pawn(window, cell.value, center_x, center_y)
+
+    # Draw cross of the pawn color if it's a goal
+    if cell.is_goal and cell.goal_pawn_id > 0:
+        draw_cross(window, center_x, center_y)
+
+def draw_pawn(window : pg.Surface, pawn_id : int, center_x : int, center_y : int) -> None:
+    col : tuple[int, int, int] = c.PAWN_COLORS[pawn_id]
+    pawn_size : int = c.CELL_SIZE // 3
+
+    pg.draw.circle(window, c.BLACK, (center_x, center_y), pawn_size)
+    pg.draw.circle(window, c.WHITE, (center_x, center_y), pawn_size - 1)
+    pg.draw.circle(window, col, (center_x, center_y), pawn_size - 2)
+
+def draw_cross(window : pg.Surface, center_x : int, center_y : int) -> None:
+    cross_size : int = c.CELL_SIZE // 3
+
+    pg.draw.line(window, c.BLACK, (center_x - cross_size, center_y), (center_x + cross_size, center_y), 4)
+    pg.draw.line(window, c.BLACK, (center_x, center_y - cross_size), (center_x, center_y + cross_size), 4)
+
+    pg.draw.line(window, c.WHITE, (center_x - cross_size + 1, center_y), (center_x + cross_size - 1, center_y), 2)
+    pg.draw.line(window, c.WHITE, (center_x, center_y - cross_size + 1), (center_x, center_y + cross_size - 1), 2)
+
+def make_sprite(draw_function, *args) -> pg.Surface:
+    # Transparent cell sized surface holding a pawn or a cross
+    sprite = pg.Surface((c.CELL_SIZE, c.CELL_SIZE), pg.SRCALPHA)
+    draw_function(sprite, *args, c.CELL_SIZE // 2, c.CELL_SIZE // 2)
+
+    return sprite
+
+class BoardRenderer:
+    # Walls and goal squares are drawn once to an off-screen surface. Each frame
+    # only the cells whose pawn changed are restored from it and redrawn.
+    def __init__(self, board : Board):
+        self.board : Board = board
+        self.background : pg.Surface = None
+        self.goal : tuple[int, int] = None
+        self.pawns : dict = {}   # (x, y) -> pawn id drawn on the window
+
+        self.sprites : dict = {pawn_id: make_sprite(draw_pawn, pawn_id) for pawn_id in range(1, c.PAWN_NUMBER + 1)}
+        self.cross : pg.Surface = make_sprite(draw_cross)
+
+    def build_background(self) -> None:
+        board : Board = self.board
+        self.background = pg.Surface((board.size * c.CELL_SIZE, board.size * c.CELL_SIZE))
+
+        for y in range(board.size):
+            for x in range(board.size):
+                draw_cell(self.background, board.get_cell(x, y), x, y, with_pawn=False)
+
+        self.goal = board.get_goal()
+
+    def get_pawns(self) -> dict:
+        pawns : dict = {}
+
+        for pawn_id in range(1, c.PAWN_NUMBER + 1):
+            pos : tuple[int, int] = self.board.get_pawn(pawn_id)
+
+            if pos != (-1, -1):
+                pawns[pos] = pawn_id
+
+        return pawns
+
+    def draw_pawn_cell(self, window : pg.Surface, pos : tuple[int, int], pawn_id : int) -> pg.Rect:
+        x, y = pos
+        rect = pg.Rect(x * c.CELL_SIZE, y * c.CELL_SIZE, c.CELL_SIZE, c.CELL_SIZE)
+
+        window.blit(self.background, rect, rect)
+
+        if pawn_id > 0:
+            window.blit(self.sprites[pawn_id], rect)
+
+            # The goal cross stays on top of the pawn
+            if pos == self.goal:
+                window.blit(self.cross, rect)
+
+        return rect
+
+    def draw(self, window : pg.Surface, force : bool = False) -> list[pg.Rect]:
+        # Returns the window areas that changed
+        pawns : dict = self.get_pawns()
+
+        if force or self.background is None or self.board.get_goal() != self.goal:
+            self.build_background()
+            window.blit(self.background, (0, 0))
+
+            for pos, pawn_id in pawns.items():
+                self.draw_pawn_cell(window, pos, pawn_id)
+
+            self.pawns = pawns
+            return [self.background.get_rect()]
+
+        dirty : list = []
+        for pos in set(self.pawns) | set(pawns):
+            if self.pawns.get(pos) != pawns.get(pos):
+                dirty.append(self.draw_pawn_cell(window, pos, pawns.get(pos, 0)))
+
+        self.pawns = pawns
+        return dirty
+
+class TextCache:
+    # Rendered text surfaces, kept until the text changes
+    def __init__(self, font : pg.font.Font, size : int = c.TEXT_CACHE_SIZE):
+        self.font : pg.font.Font = font
+        self.size : int = size
+        self.surfaces : dict = {}
+
+    def render(self, text : str) -> pg.Surface:
+        surface = self.surfaces.get(text)
+
+        if surface is None:
+            # Texts with counters keep changing: start over rather than grow
+            if len(self.surfaces) >= self.size:
+                self.surfaces.clear()
+
+            surface = self.font.render(text, False, c.WHITE)
+            self.surfaces[text] = surface
+
+        return surface
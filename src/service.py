@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+import argparse, asyncio, itertools, json, multiprocessing, sys, time
+
+import consts as c
+import state as st
+import heuristic
+
+from batch import load_board, generate_deals, setup_deal
+from deadline import Deadline, TaskFlags, TaskEvent
+from solvers import SOLVERS
+from speculate import PROGRESS, DONE, SOLUTION
+from stats import SearchStats
+from topology import Topology
+
+# Solver service shared by several games and batch jobs, one JSON object per
+# line over a local TCP or Unix socket.
+#
+# Request: {"id": ..., "board": <board file>, "goal": [x, y], "pawns": [[x, y], ...],
+#           "deadline": <seconds>, "solver": <name>, "heuristic": <name>}
+# Replies, carrying the id of their request:
+#   {"type": "accepted", "shared": <the same deal was already being solved>}
+#   {"type": "progress", "stats": {...}}
+#   {"type": "solution", "path": [...], "stats": {...}}  better path (anytime solver)
+#   {"type": "done", "path": [...] or null, "stats": {...}}
+#   {"type": "error", "message": ...}
+# Paths are lists of pawn positions, from the initial positions to the goal.
+#
+# Identical requests in progress share one search. Deals wait in a bounded
+# queue for a solver process: while it is full, the connection sending the
+# request is no longer read, so the client is slowed down by the socket itself.
+# Closing a connection abandons its requests: a search left without any client
+# is stopped, and frees its solver process for the deals still waiting.
+
+# Per-process solver context, set once by init_worker
+worker : dict = {}
+
+def init_worker(board_files : list, cancel_event, task_flags, messages) -> None:
+    worker["boards"] = {name: load_board(name) for name in board_files}
+    worker["cancel_event"] = cancel_event
+    worker["task_flags"] = task_flags
+    worker["messages"] = messages
+
+def decode_path(path : list) -> list:
+    # Packed states (dest to src) to pawn positions (src to dest)
+    if not path:
+        return None
+
+    return [[list(pos) for pos in st.decode_state(state)] for state in reversed(path)]
+
+def solve_task(task : tuple) -> None:
+    job_id, slot, board_file, goal, pawns, solver, heuristic_name, time_limit = task
+    board = worker["boards"][board_file]
+    messages = worker["messages"]
+
+    # The process may have solved a deal on a board of another size since
+    c.set_geometry(board.size, board.topology.pawn_number)
+    setup_deal(board, goal, st.encode_state(pawns))
+
+    stats = SearchStats(on_progress=lambda stats: messages.put((PROGRESS, job_id, stats.to_dict())),
+                        on_solution=lambda stats, path: messages.put((SOLUTION, job_id, (decode_path(path), stats.to_dict()))))
+    estimator = heuristic.build_estimator(heuristic_name, board)
+
+    cancel = TaskEvent(worker["task_flags"], slot, worker["cancel_event"])
+    path : list = SOLVERS[solver](board, estimator, Deadline(time_limit, cancel), stats=stats)
+
+    messages.put((DONE, job_id, (decode_path(path), stats.to_dict())))
+
+class Connection:
+    def __init__(self, writer : asyncio.StreamWriter):
+        self.writer : asyncio.StreamWriter = writer
+        self.outbox : asyncio.Queue = asyncio.Queue()
+        self.requests = asyncio.Semaphore(c.SERVICE_CLIENT_REQUESTS) # Requests in progress
+        self.closed : bool = False
+
+    def send(self, message : dict, droppable : bool = False) -> None:
+        if self.closed:
+            return
+
+        # Progress reports are dropped when the client does not keep up
+        if droppable and self.outbox.qsize() >= c.SERVICE_OUTBOX_SIZE:
+            return
+
+        self.outbox.put_nowait(message)
+
+    async def write_loop(self) -> None:
+        while True:
+            message : dict = await self.outbox.get()
+            if message is None:
+                break
+
+            try:
+                self.writer.write((json.dumps(message) + "\n").encode())
+                await self.writer.drain()
+            except ConnectionError:
+                break
+
+class Job:
+    # One search, shared by the identical requests received while it runs
+    def __init__(self, job_id : int, key : str, task : tuple, deadline : float):
+        self.id : int = job_id
+        self.key : str = key
+        self.task : tuple = task         # (board, goal, pawns, solver, heuristic)
+        self.deadline : float = deadline # time.monotonic() value
+        self.subscribers : list = []     # (connection, request id)
+        self.slot : int = None           # Cancel flag, once handed to a solver process
+        self.finished : asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def publish(self, message : dict, droppable : bool = False) -> None:
+        for connection, request_id in self.subscribers:
+            connection.send(dict(message, id=request_id), droppable)
+
+class SolverService:
+    def __init__(self, board_files : list, workers : int = c.SERVICE_WORKERS, queue_size : int = c.SERVICE_QUEUE_SIZE):
+        # Board ids are the board files served. Requests are checked against
+        # the topology only: the boards themselves live in the solver processes.
+        self.topologies : dict = {}
+
+        for name in board_files:
+            topology = Topology(0)
+            topology.load(name)
+            topology.layout_hash = topology.compute_layout_hash()
+            self.topologies[name] = topology
+
+        self.workers : int = workers
+        self.queue : asyncio.Queue = asyncio.Queue(queue_size)
+        self.jobs : dict = {}  # deal key -> job in progress
+        self.by_id : dict = {} # job id -> job in progress
+        self.ids = itertools.count()
+        self.tasks : list = []
+
+        # Fresh interpreters, as for the game
+        context = multiprocessing.get_context("spawn")
+
+        # One cancel flag per dispatch coroutine, used by the job it hands over
+        self.messages = context.Queue()
+        self.cancel_event = context.Event()
+        self.task_flags = TaskFlags(context, workers)
+        self.pool = context.Pool(workers, init_worker, (board_files, self.cancel_event, self.task_flags.flags, self.messages))
+
+    async def start(self, host : str = c.SERVICE_HOST, port : int = c.SERVICE_PORT, path : str = None) -> asyncio.AbstractServer:
+        self.loop = asyncio.get_running_loop()
+        self.tasks = [asyncio.create_task(self.dispatch(slot)) for slot in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self.receive()))
+
+        if path:
+            return await asyncio.start_unix_server(self.handle, path)
+
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+
+        # Stop the running searches and the thread reading their messages
+        self.cancel_event.set()
+        self.pool.terminate()
+        self.pool.join()
+        self.messages.put(None)
+
+    async def handle(self, reader : asyncio.StreamReader, writer : asyncio.StreamWriter) -> None:
+        connection = Connection(writer)
+        write_task = asyncio.create_task(connection.write_loop())
+
+        try:
+            while line := await reader.readline():
+                # Wait while the client has too many requests in progress
+                await connection.requests.acquire()
+                request = None
+
+                try:
+                    request = json.loads(line)
+                    await self.submit(connection, request)
+                except (ValueError, KeyError, TypeError) as error:
+                    connection.requests.release()
+                    request_id = request.get("id") if isinstance(request, dict) else None
+                    connection.send({"id": request_id, "type": "error", "message": str(error)})
+        except ConnectionError:
+            pass
+        finally:
+            # Let the pending replies go out, then stop sending
+            connection.outbox.put_nowait(None)
+            connection.closed = True
+            self.abandon(connection)
+
+            await write_task
+            writer.close()
+
+    async def submit(self, connection : Connection, request : dict) -> None:
+        board : str = request.get("board", c.BOARD_FILE)
+        topology : Topology = self.topologies.get(board)
+        if topology is None:
+            raise ValueError(f"unknown board {board}")
+
+        goal : tuple = tuple(request["goal"])
+        pawns : tuple = tuple(tuple(pos) for pos in request["pawns"])
+        solver : str = request.get("solver", c.SOLVER)
+        heuristic_name : str = request.get("heuristic", c.HEURISTIC)
+
+        if len(pawns) != topology.pawn_number or len(set(pawns)) != len(pawns):
+            raise ValueError(f"expected {topology.pawn_number} pawns on distinct squares")
+        positions : tuple = pawns + (goal,)
+        if any(len(pos) != 2 or not all(isinstance(v, int) and 0 <= v < topology.size for v in pos) for pos in positions):
+            raise ValueError("positions must be squares of the board")
+        if topology.get_goal_id(*goal) == 0:
+            raise ValueError("the goal must be a goal square")
+        if solver not in SOLVERS:
+            raise ValueError(f"unknown solver {solver}")
+        if heuristic_name not in heuristic.ESTIMATORS:
+            raise ValueError(f"unknown heuristic {heuristic_name}")
+
+        deadline : float = time.monotonic() + float(request.get("deadline", c.DECISION_TIME))
+        subscriber : tuple = (connection, request.get("id"))
+
+        key : str = f"{topology.layout_hash}:{goal}:{pawns}:{solver}:{heuristic_name}"
+        job : Job = self.jobs.get(key)
+
+        if job is not None:
+            # Only matters while the job waits for a solver process
+            job.deadline = max(job.deadline, deadline)
+            job.subscribers.append(subscriber)
+            connection.send({"id": subscriber[1], "type": "accepted", "shared": True})
+            return
+
+        job = Job(next(self.ids), key, (board, goal, pawns, solver, heuristic_name), deadline)
+        job.subscribers.append(subscriber)
+        self.jobs[key] = job
+        self.by_id[job.id] = job
+        connection.send({"id": subscriber[1], "type": "accepted", "shared": False})
+
+        # Blocks while the queue is full: the connection is not read meanwhile
+        await self.queue.put(job)
+
+    async def dispatch(self, slot : int) -> None:
+        # One coroutine per solver process: the next job is handed over when the previous one is done
+        while True:
+            job : Job = await self.queue.get()
+            remaining : float = job.deadline - time.monotonic()
+
+            if all(connection.closed for connection, _ in job.subscribers):
+                self.finish(job, {"type": "error", "message": "abandoned"})
+                continue
+
+            if remaining <= 0:
+                self.finish(job, {"type": "done", "path": None, "stats": {}})
+                continue
+
+            job.slot = slot
+            self.task_flags.reset(slot)
+
+            error_callback = lambda error, job=job: self.loop.call_soon_threadsafe(self.fail, job, error)
+            self.pool.apply_async(solve_task, ((job.id, slot) + job.task + (remaining,),), error_callback=error_callback)
+
+            await job.finished
+
+    async def receive(self) -> None:
+        # Solver messages come through a multiprocessing queue, read from a thread
+        while True:
+            message : tuple = await self.loop.run_in_executor(None, self.messages.get)
+            if message is None:
+                break
+
+            kind, job_id, value = message
+            job : Job = self.by_id.get(job_id)
+            if job is None:
+                continue
+
+            if kind == PROGRESS:
+                job.publish({"type": "progress", "stats": value}, droppable=True)
+            elif kind == SOLUTION:
+                path, stats = value
+                job.publish({"type": "solution", "path": path, "stats": stats})
+            else:
+                path, stats = value
+                self.finish(job, {"type": "done", "path": path, "stats": stats})
+
+    def abandon(self, connection : Connection) -> None:
+        # Stop the searches no open connection waits for anymore. They are
+        # finished as usual once their solver process notices.
+        for job in list(self.by_id.values()):
+            connections : list = [subscriber for subscriber, _ in job.subscribers]
+
+            if connection in connections and all(subscriber.closed for subscriber in connections):
+                # Identical requests coming later start a search of their own
+                if self.jobs.get(job.key) is job:
+                    del self.jobs[job.key]
+
+                if job.slot is not None:
+                    self.task_flags.cancel(job.slot)
+
+    def fail(self, job : Job, error : BaseException) -> None:
+        if job.id in self.by_id:
+            self.finish(job, {"type": "error", "message": repr(error)})
+
+    def finish(self, job : Job, message : dict) -> None:
+        job.publish(message)
+
+        for connection, _ in job.subscribers:
+            connection.requests.release()
+
+        if self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+        del self.by_id[job.id]
+        job.finished.set_result(None)
+
+class ServiceClient:
+    # Requests share one connection, replies are routed by request id
+    def __init__(self):
+        self.replies : dict = {} # request id -> queue of replies
+        self.ids = itertools.count()
+
+    async def connect(self, host : str = c.SERVICE_HOST, port : int = c.SERVICE_PORT, path : str = None) -> None:
+        if path:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+
+        self.read_task = asyncio.create_task(self.read_loop())
+
+    async def read_loop(self) -> None:
+        while line := await self.reader.readline():
+            message : dict = json.loads(line)
+            replies : asyncio.Queue = self.replies.get(message.get("id"))
+
+            if replies is not None:
+                replies.put_nowait(message)
+
+    async def solve(self, **request):
+        # Yields the replies to one request, up to the last one
+        request_id : int = next(self.ids)
+        replies : asyncio.Queue = asyncio.Queue()
+        self.replies[request_id] = replies
+
+        self.writer.write((json.dumps(dict(request, id=request_id)) + "\n").encode())
+        await self.writer.drain()
+
+        try:
+            while True:
+                message : dict = await replies.get()
+                yield message
+
+                if message["type"] in ("done", "error"):
+                    break
+        finally:
+            del self.replies[request_id]
+
+    async def close(self) -> None:
+        self.read_task.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def serve(args) -> None:
+    service = SolverService(args.board, args.workers or multiprocessing.cpu_count(), args.queue_size)
+    server = await service.start(args.host, args.port, args.unix)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+async def run_client(args) -> None:
+    # Sends seeded deals at once (each one copies times) and prints one JSON line per reply
+    board_file : str = args.board[0]
+    board = load_board(board_file)
+    deals : list = generate_deals(board, args.seed, args.deals)
+
+    client = ServiceClient()
+    await client.connect(args.host, args.port, args.unix)
+
+    async def solve(index : int, goal : tuple, state : int) -> None:
+        start : float = time.perf_counter()
+        shared : bool = False
+
+        request : dict = {"board": board_file, "goal": list(goal), "pawns": [list(p) for p in st.decode_state(state)],
+                          "deadline": args.deadline, "solver": args.solver, "heuristic": args.heuristic}
+
+        async for message in client.solve(**request):
+            if message["type"] == "accepted":
+                shared = message["shared"]
+            elif message["type"] in ("done", "error"):
+                result : dict = {"deal": index, "shared": shared, "time": round(time.perf_counter() - start, 6)}
+
+                if message["type"] == "done":
+                    result["moves"] = len(message["path"]) - 1 if message["path"] else None
+                    result.update(message["stats"])
+                else:
+                    result["error"] = message["message"]
+
+                sys.stdout.write(json.dumps(result) + "\n")
+                sys.stdout.flush()
+
+    await asyncio.gather(*(solve(i, goal, state) for i, (goal, state) in enumerate(deals) for _ in range(args.copies)))
+    await client.close()
+
+def parse_args(argv : list):
+    parser = argparse.ArgumentParser(description="Solver service shared by games and batch jobs.")
+    parser.add_argument("--board", action="append", help="board file served (repeatable, the client uses the first)")
+    parser.add_argument("--host", default=c.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=c.SERVICE_PORT)
+    parser.add_argument("--unix", default=None, help="Unix socket path, instead of TCP")
+    parser.add_argument("--workers", type=int, default=c.SERVICE_WORKERS, help="solver processes (0 for one per core)")
+    parser.add_argument("--queue-size", type=int, default=c.SERVICE_QUEUE_SIZE, help="deals waiting for a solver process")
+
+    # Client mode
+    parser.add_argument("--client", action="store_true", help="send seeded deals to a running service")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to draw the deals")
+    parser.add_argument("--deals", type=int, default=10, help="number of deals")
+    parser.add_argument("--copies", type=int, default=1, help="requests sent for each deal")
+    parser.add_argument("--deadline", type=float, default=c.DECISION_TIME, help="seconds allowed per deal")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), default=c.SOLVER)
+    parser.add_argument("--heuristic", choices=heuristic.ESTIMATORS, default=c.HEURISTIC)
+
+    args = parser.parse_args(argv)
+    args.board = args.board or [c.BOARD_FILE]
+
+    return args
+
+def main(argv : list = None):
+    args = parse_args(argv)
+
+    try:
+        asyncio.run(run_client(args) if args.client else serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import functools
+
+import astar
+import idastar
+import bidirectional
+import layered
+import anytime
+import external
+import hda
+
+# Solvers sharing the astar.astar interface: (board, h_score, stop_event=None, ...)
+SOLVERS : dict = {
+    "astar": astar.astar,
+    "canonical": functools.partial(astar.astar, canonical=True),
+    "ida": idastar.ida_star,
+    "bidirectional": bidirectional.bidirectional,
+    "layered": layered.layered,
+    "anytime": anytime.anytime,
+    "external": external.external,
+    "hda": hda.hda
+}
+
+# Solvers starting their own processes, which the processes of a pool may not do
+PARALLEL : set = {"hda"}
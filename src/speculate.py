@@ -0,0 +1,152 @@
+import multiprocessing, multiprocessing.pool, queue
+
+import consts as c
+import heuristic
+
+from batch import load_board, setup_deal
+from deadline import TaskDeadline, TaskFlags, TaskEvent
+from solvers import SOLVERS, PARALLEL
+from stats import SearchStats
+
+# Background solving for the game. Each deal is sent to a worker process as
+# soon as it is drawn, a few deals ahead of the one being played, so the
+# solution is usually ready before the computer turn. The time limit of a
+# search only counts from the computer turn of its deal: a search picked up
+# long before is never cut short ahead of it. Workers report progress and
+# solutions through a queue that the game loop drains every frame.
+
+PROGRESS : int = 0
+DONE : int = 1
+SOLUTION : int = 2 # Better path found by a solver still searching
+
+# Cancel flags of the deals submitted, reused in turn: far more than the deals
+# ever waiting for a worker (PREPARED_DEALS)
+TASK_SLOTS : int = 64
+
+# Per-process solver context, set once by init_worker
+worker : dict = {}
+
+def init_worker(board_file : str, solver : str, heuristic_name : str, time_limit : float, cancel_event, task_flags, task_starts, messages) -> None:
+    worker["board"] = load_board(board_file)
+    worker["solver"] = solver
+    worker["heuristic"] = heuristic_name
+    worker["time_limit"] = time_limit
+    worker["cancel_event"] = cancel_event
+    worker["task_flags"] = task_flags
+    worker["task_starts"] = task_starts
+    worker["messages"] = messages
+
+def solve_task(task : tuple) -> None:
+    key, slot, goal, state = task
+    board = worker["board"]
+    messages = worker["messages"]
+
+    # Deals forgotten while waiting for the worker are skipped
+    cancel = TaskEvent(worker["task_flags"], slot, worker["cancel_event"])
+    if cancel.is_set():
+        return
+
+    setup_deal(board, goal, state)
+
+    stats = SearchStats(on_progress=lambda stats: messages.put((PROGRESS, key, stats.to_dict())),
+                        on_solution=lambda stats, path: messages.put((SOLUTION, key, (path, stats.to_dict()))))
+    estimator = heuristic.build_estimator(worker["heuristic"], board)
+
+    deadline = TaskDeadline(worker["time_limit"], worker["task_starts"], slot, cancel)
+    path : list = SOLVERS[worker["solver"]](board, estimator, deadline, stats=stats)
+
+    messages.put((PROGRESS, key, stats.to_dict()))
+    messages.put((DONE, key, path))
+
+class Speculator:
+    def __init__(self, board_file : str, solver : str = "astar", heuristic_name : str = c.HEURISTIC, workers : int = c.SPECULATIVE_WORKERS, time_limit : float = c.SPECULATIVE_TIME_LIMIT):
+        # Fresh interpreters: the workers do not inherit the pygame state
+        context = multiprocessing.get_context("spawn")
+
+        self.messages = context.Queue()
+        self.cancel_event = context.Event()
+        self.task_flags = TaskFlags(context, TASK_SLOTS)
+        init_args : tuple = (board_file, solver, heuristic_name, time_limit, self.cancel_event, self.task_flags.flags, self.task_flags.starts, self.messages)
+
+        if solver in PARALLEL:
+            # The solver starts its own processes: deals are solved one at a
+            # time from a thread of the game process, which only waits for them
+            self.pool = multiprocessing.pool.ThreadPool(1, init_worker, init_args)
+        else:
+            self.pool = context.Pool(workers, init_worker, init_args)
+
+        self.pending : set = set() # deal keys submitted and not forgotten
+        self.results : dict = {}   # deal key -> path (empty if no solution was found)
+        self.progress : dict = {}  # deal key -> latest search statistics
+        self.best : dict = {}      # deal key -> best path published before the end of the search
+        self.slots : dict = {}     # deal key -> cancel flag of its search
+
+    def submit(self, key : str, goal : tuple[int, int], state : int) -> None:
+        self.pending.add(key)
+        self.slots[key] = self.task_flags.allocate()
+        self.pool.apply_async(solve_task, ((key, self.slots[key], goal, state),))
+
+    def poll(self) -> list[tuple]:
+        # Store and return the messages received since the last call
+        received : list = []
+
+        while True:
+            try:
+                message : tuple = self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            kind, key, value = message
+            if key not in self.pending:
+                continue
+
+            if kind == PROGRESS:
+                self.progress[key] = value
+            elif kind == SOLUTION:
+                self.best[key], self.progress[key] = value
+            else:
+                self.results[key] = value
+
+            received.append(message)
+
+        return received
+
+    def has_result(self, key : str) -> bool:
+        return key in self.results
+
+    def pop_result(self, key : str) -> list[int]:
+        path : list = self.results[key]
+        self.forget(key)
+
+        return path
+
+    def start_clock(self, key : str) -> None:
+        # The computer turn of the deal begins: its time limit counts from now
+        if key in self.slots:
+            self.task_flags.start_clock(self.slots[key])
+
+    def get_progress(self, key : str) -> dict:
+        return self.progress.get(key, {})
+
+    def get_best(self, key : str) -> list[int]:
+        return self.best.get(key, [])
+
+    def is_optimal(self, key : str) -> bool:
+        # Solvers other than the anytime one only return optimal paths
+        return self.get_progress(key).get("suboptimality") in (None, 1.0)
+
+    def forget(self, key : str) -> None:
+        # A search still running or waiting for a worker is stopped
+        if key in self.slots:
+            self.task_flags.cancel(self.slots.pop(key))
+
+        self.pending.discard(key)
+        self.results.pop(key, None)
+        self.progress.pop(key, None)
+        self.best.pop(key, None)
+
+    def close(self) -> None:
+        # Stop the running search and the worker processes
+        self.cancel_event.set()
+        self.pool.terminate()
+        self.pool.join()
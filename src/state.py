@@ -0,0 +1,72 @@
+import consts as c
+
+# A search state packs every pawn position into a single integer.
+# Each pawn takes PAWN_BITS bits: x in the low COORD_BITS bits, y in the high ones,
+# so the packed value of a pawn is y * ROW_STRIDE + x (the cell index on a 16x16 board).
+# Pawn i (id i + 1) is stored at bit offset i * PAWN_BITS.
+
+def encode_pos(pos : tuple[int, int]) -> int:
+    x, y = pos
+    return (y << c.COORD_BITS) | x
+
+def decode_pos(cell : int) -> tuple[int, int]:
+    return (cell & c.COORD_MASK, cell >> c.COORD_BITS)
+
+def encode_state(pawns) -> int:
+    state : int = 0
+
+    for i, pos in enumerate(pawns):
+        state |= encode_pos(pos) << (i * c.PAWN_BITS)
+
+    return state
+
+def decode_state(state : int) -> tuple:
+    pawns : list = []
+
+    for i in range(c.PAWN_NUMBER):
+        pawns.append(decode_pos((state >> (i * c.PAWN_BITS)) & c.PAWN_MASK))
+
+    return tuple(pawns)
+
+def get_cell(state : int, index : int) -> int:
+    return (state >> (index * c.PAWN_BITS)) & c.PAWN_MASK
+
+def set_cell(state : int, index : int, cell : int) -> int:
+    shift : int = index * c.PAWN_BITS
+    return (state & ~(c.PAWN_MASK << shift)) | (cell << shift)
+
+def get_pawn_pos(state : int, index : int) -> tuple[int, int]:
+    return decode_pos(get_cell(state, index))
+
+def canonical_state(state : int, goal_index : int) -> int:
+    # The other pawns only block the goal pawn: sorting their cells gives
+    # every permutation of them the same packed state
+    goal_shift : int = goal_index * c.PAWN_BITS
+    others : list = sorted(get_cell(state, i) for i in range(c.PAWN_NUMBER) if i != goal_index)
+    canonical : int = state & (c.PAWN_MASK << goal_shift)
+
+    index : int = 0
+    for cell in others:
+        if index == goal_index:
+            index += 1
+
+        canonical |= cell << (index * c.PAWN_BITS)
+        index += 1
+
+    return canonical
+
+def read_board(board) -> int:
+    # Pack the pawns currently placed on the board
+    pawns : list = []
+    for i in range(c.PAWN_NUMBER):
+        pawns.append(board.get_pawn(i + 1))
+
+    return encode_state(pawns)
+
+def write_board(board, state : int) -> None:
+    # Place the pawns of a packed state on the board
+    board.clear_pawns()
+
+    for i in range(c.PAWN_NUMBER):
+        x, y = get_pawn_pos(state, i)
+        board.set_cell_value(x, y, i + 1)
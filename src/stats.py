@@ -0,0 +1,124 @@
+import json, time
+
+import consts as c
+
+# Search statistics. Solvers only touch them when a SearchStats is passed:
+# they then swap in the timed neighbor function and the instrumented open list
+# below, so the search loop itself is the same with or without statistics.
+
+class SearchStats:
+    def __init__(self, on_progress=None, progress_interval : int = c.PROGRESS_INTERVAL, on_solution=None):
+        self.expanded : int = 0         # States whose neighbors were generated
+        self.generated : int = 0        # Neighbors produced by those expansions
+        self.pushes : int = 0           # Open list insertions
+        self.stale_pops : int = 0       # Outdated open list entries skipped
+        self.open_high_water : int = 0  # Largest open list size
+        self.f_bound = 0                # Highest f taken from the open list (or IDA* bound)
+        self.neighbor_time : float = 0.0
+        self.queue_time : float = 0.0
+        self.start : float = time.perf_counter()
+
+        # Best path published by an anytime solver, and how far from optimal it may be
+        self.best_moves = None
+        self.suboptimality = None
+
+        # Called with the stats every progress_interval expansions
+        self.on_progress = on_progress
+        self.progress_interval : int = progress_interval
+
+        # Called with the stats and the path each time a better path is published
+        self.on_solution = on_solution
+
+    def report_solution(self, path : list, suboptimality : float) -> None:
+        self.best_moves = len(path) - 1
+        self.suboptimality = suboptimality
+
+        if self.on_solution is not None:
+            self.on_solution(self, path)
+
+    def wrap_neighbors(self, get_neighbors):
+        def timed_neighbors(stops : dict, state : int) -> list[int]:
+            start : float = time.perf_counter()
+            neighbors : list = get_neighbors(stops, state)
+            self.neighbor_time += time.perf_counter() - start
+
+            self.expanded += 1
+            self.generated += len(neighbors)
+
+            if self.on_progress is not None and self.expanded % self.progress_interval == 0:
+                self.on_progress(self)
+
+            return neighbors
+
+        return timed_neighbors
+
+    def wrap_open_list(self, open_list, track_bound : bool = True):
+        return InstrumentedOpenList(open_list, self, track_bound)
+
+    def get_elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def to_dict(self) -> dict:
+        return {
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "pushes": self.pushes,
+            "stale_pops": self.stale_pops,
+            "open_high_water": self.open_high_water,
+            "f_bound": self.f_bound,
+            "neighbor_time": round(self.neighbor_time, 6),
+            "queue_time": round(self.queue_time, 6),
+            "elapsed": round(self.get_elapsed(), 6),
+            "best_moves": self.best_moves,
+            "suboptimality": self.suboptimality
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+def export(record : dict) -> None:
+    # Append a JSON line to STATS_FILE, when one is set
+    if c.STATS_FILE is None:
+        return
+
+    with open(c.STATS_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+class InstrumentedOpenList:
+    # Open list proxy timing and counting the queue operations
+    def __init__(self, open_list, stats : SearchStats, track_bound : bool = True):
+        self.open_list = open_list
+        self.stats : SearchStats = stats
+
+        # Weighted f values are no lower bound: f_bound is then left alone
+        self.track_bound : bool = track_bound
+
+    def push(self, f, state : int) -> None:
+        start : float = time.perf_counter()
+        self.open_list.push(f, state)
+        self.stats.queue_time += time.perf_counter() - start
+
+        self.stats.pushes += 1
+        if len(self.open_list) > self.stats.open_high_water:
+            self.stats.open_high_water = len(self.open_list)
+
+    def pop(self) -> int:
+        start : float = time.perf_counter()
+        f = self.open_list.peek_f()
+        state : int = self.open_list.pop()
+        self.stats.queue_time += time.perf_counter() - start
+
+        self.stats.stale_pops = self.open_list.stale
+        if self.track_bound and f > self.stats.f_bound:
+            self.stats.f_bound = f
+
+        return state
+
+    def peek_f(self):
+        return self.open_list.peek_f()
+
+    def __contains__(self, state : int) -> bool:
+        return state in self.open_list
+
+    def __len__(self) -> int:
+        return len(self.open_list)
@@ -0,0 +1,81 @@
+import hashlib
+
+import consts as c
+
+# Part of a board that never changes during a game: walls and goal squares,
+# stored as flat lists indexed by y * size + x. Boards share their topology,
+# so copying a board only copies the pawns and the goal.
+#
+# Board file format: one line of comma separated wall masks (COL_*) per row,
+# the number of rows giving the board size, plus the lines
+#   pawns <count>
+#   goal <pawn id> <x> <y>
+# Empty lines and lines starting with # are ignored.
+
+class Topology:
+    def __init__(self, size : int):
+        self.size : int = size
+        self.pawn_number : int = c.PAWN_NUMBER
+        self.walls : list = [0] * (size * size)     # COL_* bit masks
+        self.goal_ids : list = [0] * (size * size)  # Pawn id of the goal square (0 = none)
+        self.goals : dict = {}                      # Pawn id -> goal squares, in file order
+
+        # Tables derived from the walls, filled by Board.create_grid
+        self.stops : dict = {}
+        self.layout_hash : str = ""
+        self.goal_tables : dict = {}
+
+        # Pattern database file, mapped on first use (see patterndb)
+        self.pattern_file : str = ""
+        self.pattern_tables : dict = None
+
+        # File the board was read from, read again by the parallel solver processes
+        self.board_file : str = ""
+
+    def load(self, filename : str) -> None:
+        with open(filename, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+
+        rows : list = []
+        goals : list = []
+
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            words : list = line.split()
+            if words[0] == "pawns":
+                self.pawn_number = int(words[1])
+            elif words[0] == "goal":
+                goals.append(tuple(int(w) for w in words[1:4]))
+            else:
+                rows.append([int(value) for value in line.split(',')])
+
+        if any(len(row) != len(rows) for row in rows):
+            raise ValueError(f"{filename}: the board must be square")
+
+        self.size = len(rows)
+        self.walls = [value for row in rows for value in row]
+        self.goal_ids = [0] * (self.size * self.size)
+        self.goals = {}
+
+        # Set goal pawn ids in cells
+        for col_id, x, y in goals:
+            self.goal_ids[y * self.size + x] = col_id
+            self.goals.setdefault(col_id, []).append((x, y))
+
+    def compute_layout_hash(self) -> str:
+        # Identifies the walls and goal squares, whatever the pawns and goal
+        digest = hashlib.sha1()
+
+        for collision, goal_id in zip(self.walls, self.goal_ids):
+            digest.update(bytes((collision, goal_id)))
+
+        return digest.hexdigest()
+
+    def get_walls(self, x : int, y : int) -> int:
+        return self.walls[y * self.size + x]
+
+    def get_goal_id(self, x : int, y : int) -> int:
+        return self.goal_ids[y * self.size + x]